@@ -1,13 +1,94 @@
+from pathlib import Path
+
+# project root, so model/data paths don't depend on the working directory
+BASE_DIR = Path(__file__).resolve().parent.parent
+
 WIN_HOST = "127.0.0.1"
 WIN_PORT = 6001
 
 WSL_HOST = "172.29.130.227"   
 WSL_PORT = 6000
 
+# Windows client connection pool
+WIN_POOL_MAX_CONNECTIONS = 10
+WIN_POOL_MAX_KEEPALIVE = 5
+WIN_KEEPALIVE_EXPIRY = 30  # seconds
+
+# Multiplexed WebSocket transport to the Windows listener (falls back to HTTP)
+WIN_USE_WEBSOCKET = True
+WIN_WS_PATH = "/ws"
+WIN_WS_RETRY_INTERVAL = 30  # seconds
+
+# Circuit breaker for an offline Windows listener
+WIN_BREAKER_THRESHOLD = 3   # consecutive connect errors/timeouts
+WIN_BREAKER_COOLDOWN = 5    # seconds between background probes
+
+# Micro-batching of concurrent /command classifications (0 disables it)
+COMMAND_BATCH_WINDOW_MS = 0
+COMMAND_BATCH_MAX_SIZE = 32
+
 PING_INTERVAL = 6  # seconds
 WIN_BASE_URL = f"http://{WIN_HOST}:{WIN_PORT}"
 WSL_BASE_URL = f"http://{WSL_HOST}:{WSL_PORT}"
 
 
 LOG_FILE = "logs/backend.log"
-TEMPLATES_PATH = "configs/templates.json"
\ No newline at end of file
+TEMPLATES_PATH = str(BASE_DIR / "configs/templates.json")
+TEMPLATES_RELOAD_INTERVAL = 2  # seconds between templates.json mtime checks
+
+# Task graph time limits; nodes and graphs can override them ("timeout", "deadline")
+GRAPH_NODE_TIMEOUT = 5   # seconds per controller attempt
+GRAPH_DEADLINE = 30      # seconds for a whole graph run
+GRAPH_BACKOFF_MAX = 2    # cap on the delay between retries
+
+# Worker pools for task graph function nodes ("io" threads, "cpu" processes)
+FUNCTION_THREAD_WORKERS = 4
+FUNCTION_PROCESS_WORKERS = 1
+
+# fuzzy_select / fuzzy_rank
+FUZZY_SCORE_CUTOFF = 60      # token_set_ratio 0-100; below it a choice never matches
+FUZZY_INDEX_CACHE_SIZE = 8   # preprocessed choice lists kept per process
+FUZZY_WORKERS = 1            # process.cdist threads (-1 = all cores)
+
+# Results of read-only Windows actions cached on this side: action -> TTL seconds
+ACTION_CACHE_TTL = {"list_folder_contents": 30}
+ACTION_CACHE_SIZE = 256
+# Actions that change files; they drop cached results for the paths they touch
+MUTATING_ACTIONS = {"batch_move"}
+
+# Decision node conditions (src/core/state.py)
+STATE_PUSH_TTL = 300       # seconds a state pushed by the Windows agent is trusted
+STATE_PROBE_TIMEOUT = 3    # seconds for a tasklist.exe / powershell.exe probe
+WORKSPACE_PATH = "~/projects/jarvis"  # opened by prepare_work_environment
+
+# Command tracing (src/core/tracing.py); a /command can also ask for its trace
+TRACE_COMMANDS = False  # trace every command, not only those that request it
+TRACE_BUFFER_SIZE = 100  # recent traces served by /traces
+
+COMMANDS_PATH = str(BASE_DIR / "data/commands.csv")
+INTENT_MODEL_PATHS = {
+    "model": str(BASE_DIR / "src/models/intent_predictor_model.pkl"),
+    "vectorizer": str(BASE_DIR / "src/models/vectorizer.pkl"),
+    "label_encoder": str(BASE_DIR / "src/models/label_encoder.pkl"),
+}
+# NumPy export of the models above, preferred at runtime (python -m src.core.scorer)
+INTENT_SCORER_DIR = str(BASE_DIR / "src/models/intent_scorer")
+
+# Background retraining (corrections come in through /feedback)
+CORRECTIONS_PATH = str(BASE_DIR / "data/corrections.csv")
+RETRAIN_HOLDOUT = 0.2
+RETRAIN_MIN_ACCURACY = 0.7  # floor on held-out accuracy
+RETRAIN_TOLERANCE = 0.01    # allowed accuracy drop vs the running model
+RETRAIN_EVERY = 25          # corrections before an automatic retrain, 0 disables
+
+INTENT_CACHE_SIZE = 512
+INTENT_CACHE_TTL = 3600  # seconds
+
+# WSL/drvfs path classification
+PATH_CACHE_SIZE = 2048
+PATH_CACHE_TTL = 300  # seconds
+PATH_WORKERS = 8
+
+REGISTRY_SNAPSHOT_PATH = str(BASE_DIR / "cache/registry.json")
+REGISTRY_RETRY_INTERVAL = 5  # seconds
+REGISTRY_REFRESH_INTERVAL = 60  # seconds
\ No newline at end of file
@@ -1,4 +1,6 @@
 import asyncio, traceback, time
+STARTED_AT = time.perf_counter()
+
 try:
     # from src.core.planner import Planner
     # from src.core.executor import Executor
@@ -16,6 +18,7 @@ except Exception as e:
 REGISTRY = None
 
 async def run():
+    executor = listener = None
     try:
         while True:
             planner, executor = await initialize_components()
@@ -23,10 +26,10 @@ async def run():
             if planner:
                 break
 
-            time.sleep(5)
+            await asyncio.sleep(5)
             logger.info("Retrying initialization")
 
-        listener = WSLBackend(planner, executor)
+        listener = WSLBackend(planner, executor, started_at=STARTED_AT)
         listener.start()
         await asyncio.Event().wait()
 
@@ -34,6 +37,14 @@ async def run():
         logger.error(f"Init failed: {e}")
         await asyncio.sleep(5)
 
+    finally:
+        if listener:
+            listener.close()
+        if executor:
+            await executor.controller.close()
+            executor.paths.close()
+            executor.close()
+
 
 
 if __name__ == "__main__":
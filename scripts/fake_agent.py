@@ -0,0 +1,198 @@
+"""
+Local stand-in for the Windows agent, for exercising WindowsClient.
+
+    python -m scripts.fake_agent                 # serve on WIN_HOST:WIN_PORT
+    python -m scripts.fake_agent --port 6004 --no-ws --no-batch
+    python -m scripts.fake_agent --check         # run the transport checks below
+
+Endpoints:
+    GET  /health               also counts the requests served per endpoint
+    GET  /registry             ETag / If-None-Match aware
+    POST /action/{action}      {"result": {"success": true, "data": {...}}}
+    POST /actions              batched actions, ordered or not
+    WS   /ws                   {"id", "action", "params"} -> {"id", "response"}
+    POST /push                 broadcasts the JSON body to every WebSocket client
+
+An action's "delay" param (seconds) holds its reply back, so concurrent
+WebSocket requests come back out of order; "fail": true makes it fail.
+"""
+from collections import Counter
+import argparse, asyncio, json, threading, time
+
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+import uvicorn
+
+from configs.config import WIN_HOST, WIN_PORT, WIN_WS_PATH
+
+
+
+REGISTRY = {
+    "modules": {
+        "files": {"list_folder_contents": {"cache_ttl": 30}, "batch_move": {"mutates": True}},
+        "system": ["open_folder", "open_file", "open_app", "launch_app", "focus_app", "open_vlc"],
+    },
+    "file_registry": {"projects": "C:\\Users\\me\\projects", "chrome": "https://www.google.com"},
+}
+REGISTRY_ETAG = '"fake-1"'
+
+
+async def run_action(action: str, params: dict) -> dict:
+    await asyncio.sleep(params.get("delay", 0))
+    if params.get("fail"):
+        return {"result": {"success": False, "error": f"{action} failed"}}
+    if action == "list_folder_contents":
+        return {"result": {"success": True, "data": {"folders": ["jarvis-backend", "notes"], "files": ["todo.txt"]}}}
+    return {"result": {"success": True, "data": {"action": action, "params": params}}}
+
+
+def create_app(websocket=True, batch=True) -> FastAPI:
+    app = FastAPI(title="FakeWindowsAgent")
+    sockets = set()
+    served = Counter()
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy", "served": served}
+
+    @app.get("/registry")
+    def registry(request: Request):
+        if request.headers.get("If-None-Match") == REGISTRY_ETAG:
+            return Response(status_code=304)
+        return Response(json.dumps(REGISTRY), media_type="application/json", headers={"ETag": REGISTRY_ETAG})
+
+    @app.post("/action/{action}")
+    async def action(action: str, request: Request):
+        served["action"] += 1
+        return await run_action(action, await request.json())
+
+    if batch:
+        @app.post("/actions")
+        async def actions(request: Request):
+            served["actions"] += 1
+            body = await request.json()
+            if not body.get("ordered", True):
+                results = await asyncio.gather(*(run_action(a["action"], a.get("params") or {}) for a in body["actions"]))
+                return {"results": list(results)}
+
+            results = []
+            for a in body["actions"]:
+                results.append(await run_action(a["action"], a.get("params") or {}))
+                if not results[-1]["result"]["success"]:
+                    break
+            return {"results": results}
+
+    @app.post("/push")
+    async def push(request: Request):
+        message = await request.json()
+        for sock in list(sockets):
+            await sock.send_text(json.dumps(message))
+        return {"sent": len(sockets)}
+
+    if websocket:
+        @app.websocket(WIN_WS_PATH)
+        async def ws(sock: WebSocket):
+            await sock.accept()
+            sockets.add(sock)
+
+            async def reply(message):
+                served["ws"] += 1
+                response = await run_action(message["action"], message.get("params") or {})
+                await sock.send_text(json.dumps({"id": message["id"], "response": response}))
+
+            try:
+                while True:
+                    message = json.loads(await sock.receive_text())
+                    asyncio.create_task(reply(message))
+            except WebSocketDisconnect:
+                pass
+            finally:
+                sockets.discard(sock)
+
+    return app
+
+
+def serve(host=WIN_HOST, port=WIN_PORT, websocket=True, batch=True):
+    uvicorn.run(create_app(websocket, batch), host=host, port=port, log_level="error")
+
+
+def serve_in_thread(port, **kwargs):
+    threading.Thread(target=serve, kwargs={"port": port, **kwargs}, daemon=True).start()
+    time.sleep(1)
+
+
+
+# ---------------- Transport checks ----------------
+
+async def check(port):
+    """Multiplexing, push routing, batching and the HTTP fallback against local agents."""
+    from src.core.client import WindowsClient
+    from src.core.executor import Executor
+    from src.core.graph import compile_graph
+    from src.core.state import StateProvider
+
+    serve_in_thread(port)
+    serve_in_thread(port + 1, websocket=False, batch=False)
+
+    client = WindowsClient(base_url=f"http://{WIN_HOST}:{port}")
+    pushed = asyncio.Event()
+    client.on_push(lambda message: message.get("event") == "ping" and pushed.set())
+
+    # the slow request goes out first but answers last, on the same socket
+    started = time.perf_counter()
+    slow, fast = await asyncio.gather(
+        client.trigger("focus_app", {"delay": 0.5, "app": "slow"}),
+        client.trigger("focus_app", {"delay": 0.1, "app": "fast"}),
+    )
+    elapsed = time.perf_counter() - started
+    assert slow["result"]["data"]["params"]["app"] == "slow", slow
+    assert fast["result"]["data"]["params"]["app"] == "fast", fast
+    assert elapsed < 0.9, f"requests were not multiplexed ({elapsed:.2f}s)"
+    print(f"multiplexing: ok ({elapsed:.2f}s for 0.5s + 0.1s)")
+
+    await client._get_client().post("/push", json={"event": "ping"})
+    await asyncio.wait_for(pushed.wait(), 2)
+    print("push routing: ok")
+
+    # a chain of independent actions goes out as one /actions request,
+    # even with the WebSocket channel open
+    chain = {"task_graph": {"id": "chain", "entry": "a", "nodes": {
+        "a": {"type": "action", "controller": "focus_app", "on_success": "b", "on_failure": "abort"},
+        "b": {"type": "action", "controller": "open_folder", "on_success": "c", "on_failure": "abort"},
+        "c": {"type": "action", "controller": "launch_app", "on_success": "done", "on_failure": "abort"},
+        "done": {"type": "noop"},
+        "abort": {"type": "abort"},
+    }}}
+    before = (await client._get_client().get("/health")).json()["served"]
+    executor = Executor(client, StateProvider(), {})
+    result = await executor.execute("", compile_graph(chain).bind())
+    executor.close()
+    after = (await client._get_client().get("/health")).json()["served"]
+    sent = {key: after.get(key, 0) - before.get(key, 0) for key in ("actions", "action", "ws")}
+    assert result.status == "success", result
+    assert sent == {"actions": 1, "action": 0, "ws": 0}, sent
+    print(f"batching: ok ({len(result.executed_nodes) - 1} actions in one request)")
+    await client.close()
+
+    client = WindowsClient(base_url=f"http://{WIN_HOST}:{port + 1}")
+    response = await client.trigger("open_folder", {"folder_name": "projects"})
+    assert response["result"]["success"], response
+    batch = await client.trigger_many([{"action": "focus_app"}, {"action": "open_vlc"}])
+    assert len(batch) == 2 and not client._batch_supported, batch
+    print("HTTP fallback: ok (no WebSocket, no /actions)")
+    await client.close()
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=WIN_HOST)
+    parser.add_argument("--port", type=int, default=WIN_PORT)
+    parser.add_argument("--no-ws", action="store_true", help="HTTP only, like an older agent")
+    parser.add_argument("--no-batch", action="store_true", help="no /actions endpoint")
+    parser.add_argument("--check", action="store_true", help="start agents on --port and --port + 1 and check the client")
+    args = parser.parse_args()
+
+    if args.check:
+        asyncio.run(check(args.port))
+    else:
+        serve(args.host, args.port, websocket=not args.no_ws, batch=not args.no_batch)
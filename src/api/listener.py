@@ -1,34 +1,102 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
+import time
 import uvicorn
 import threading
 
-from configs.config import WSL_HOST, WSL_PORT
+from configs.config import WSL_HOST, WSL_PORT, COMMAND_BATCH_WINDOW_MS, COMMAND_BATCH_MAX_SIZE, TRACE_COMMANDS
 from src.core.logger import logger
+from src.core import tracing
 from src.run_pipeline import run_pipeline
 from src.core.executor import ExecutionResult
-from src.core.intent_parser import Intent
+from src.core.intent_parser import Intent, MODEL_LOAD_STATS
+from src.core.training import ModelTrainer
 
 
 
 
 class CommandRequest(BaseModel):
     user_input: str
+    trace: bool = False
 
 
 class CommandResponse(BaseModel):
     plan: dict
     result: dict
     status: str
+    trace: dict | None = None
+
+
+class FeedbackRequest(BaseModel):
+    user_input: str
+    intent: str
+
+
+class IntentBatcher:
+    """
+    Gathers concurrent classification requests for a few milliseconds and
+    scores them with one predict_intents call.
+    """
+
+    def __init__(self, predict_many, window_ms=COMMAND_BATCH_WINDOW_MS, max_size=COMMAND_BATCH_MAX_SIZE):
+        self.predict_many = predict_many
+        self.window = window_ms / 1000
+        self.max_size = max_size
+
+        self._pending = []
+        self._flush_handle = None
+
+    async def predict(self, text: str):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        try:
+            results = self.predict_many([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug(f"Classified batch of {len(batch)} commands")
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
 
 
 class WSLBackend:
-    def __init__(self, planner, executor, host=WSL_HOST, port=WSL_PORT):
+    def __init__(self, planner, executor, host=WSL_HOST, port=WSL_PORT, batch_window_ms=COMMAND_BATCH_WINDOW_MS, started_at=None):
         self.host = host
         self.port = port
         self.planner, self.executor = planner, executor
 
+        # cold start: process start -> first /command response
+        self.started_at = started_at or time.perf_counter()
+        self.startup = {"model": MODEL_LOAD_STATS, "first_response_s": None}
+
+        self.batcher = None
+        if batch_window_ms > 0:
+            self.batcher = IntentBatcher(planner.intent_parser.predict_intents, batch_window_ms)
+        self.trainer = ModelTrainer(planner)
+
         self.app = FastAPI(title="WSLBackend")
         self.state = {
             "status": "healthy",
@@ -43,29 +111,69 @@ class WSLBackend:
         def health():
             # logger.debug("Health status: True")
             self.state["last_checked"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.state["windows_listener"] = self.executor.controller.breaker.snapshot()
+            self.state["intent_cache"] = self.planner.intent_cache.stats()
+            self.state["action_cache"] = self.executor.controller.action_cache.stats()
+            self.state["startup"] = self.startup
             return self.state
 
         @self.app.post("/command", response_model=CommandResponse)
         async def handle_command(req: CommandRequest):
-            try:
-                plan, result = await run_pipeline(
-                    req.user_input,
-                    self.planner,
-                    self.executor
-                )
-                return {
-                    "plan": plan,
-                    "result": result,
-                    "status": "success",
-                }
-            except Exception as e:
-                logger.exception("Command execution failed")
-                return {
-                    "plan": {},
-                    "result": {"error": str(e)},
-                    "status": "error"
-                }
+            with tracing.trace(req.user_input, enabled=req.trace or TRACE_COMMANDS) as trace:
+                try:
+                    plan, result = await run_pipeline(
+                        req.user_input,
+                        self.planner,
+                        self.executor,
+                        self.batcher
+                    )
+                    if self.startup["first_response_s"] is None:
+                        self.startup["first_response_s"] = round(time.perf_counter() - self.started_at, 4)
+                        logger.info(f"Cold start to first response: {self.startup['first_response_s']}s")
+                    response = {
+                        "plan": plan,
+                        "result": result,
+                        "status": "success",
+                    }
+                except Exception as e:
+                    logger.exception("Command execution failed")
+                    response = {
+                        "plan": {},
+                        "result": {"error": str(e)},
+                        "status": "error"
+                    }
+
+            if req.trace:
+                response["trace"] = trace.to_dict()
+            return response
+
+        @self.app.get("/traces")
+        def traces(limit: int = 20):
+            # most recent first
+            return {"traces": [trace.to_dict() for trace in tracing.TRACES.recent(limit)]}
+
+        @self.app.get("/traces/{trace_id}")
+        def get_trace(trace_id: str):
+            trace = tracing.TRACES.get(trace_id)
+            if trace is None:
+                raise HTTPException(status_code=404, detail=f"Unknown trace: {trace_id}")
+            return trace.to_dict()
             
+        @self.app.post("/feedback")
+        async def feedback(req: FeedbackRequest):
+            # corrected utterances feed the next background retrain
+            self.trainer.record_correction(req.user_input, req.intent)
+            return self.trainer.status()
+
+        @self.app.post("/retrain")
+        async def retrain():
+            started = self.trainer.start()
+            return {"started": started, **self.trainer.status()}
+
+        @self.app.get("/retrain")
+        def retrain_status():
+            return self.trainer.status()
+
         @self.app.get("/test")
         def test():
             logger.debug("Test status: True")
@@ -93,3 +201,6 @@ class WSLBackend:
 
     def stop(self):
         logger.info("FastAPI shutdown not implemented (use SIGTERM)")
+
+    def close(self):
+        self.trainer.close()
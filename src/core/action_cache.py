@@ -0,0 +1,131 @@
+"""
+Backend-side cache for read-only Windows actions.
+
+Cacheable actions and their TTLs come from ACTION_CACHE_TTL, and mutating
+actions from MUTATING_ACTIONS. The agent's registry can override both per
+action when a module lists its actions with metadata:
+
+    "modules": {"files": {"list_folder_contents": {"cache_ttl": 30},
+                          "batch_move": {"mutates": true}}}
+
+Only successful responses are cached. A mutating action drops the cached
+results whose folder is one of the paths it touches, or a parent or child
+of one. If none of its params looks like a path, it drops them all.
+"""
+from typing import Any, Dict, Iterator
+import copy, json
+
+from configs.config import ACTION_CACHE_SIZE, ACTION_CACHE_TTL, MUTATING_ACTIONS
+from src.core.cache import TTLCache
+from src.core.logger import logger
+from src.core.paths import is_windows_path
+
+
+
+def normalize_path(path: str) -> str:
+    return path.replace("\\", "/").rstrip("/").lower()
+
+
+def looks_like_path(value: str) -> bool:
+    return "/" in value or "\\" in value or is_windows_path(value)
+
+
+def iter_strings(value) -> Iterator[str]:
+    """Every string inside nested params (dict keys included)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from iter_strings(key)
+            yield from iter_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_strings(item)
+
+
+
+class ActionCache:
+    def __init__(self, max_size=ACTION_CACHE_SIZE):
+        self.cache = TTLCache(max_size)
+        self.ttls: Dict[str, float] = dict(ACTION_CACHE_TTL)
+        self.mutating = set(MUTATING_ACTIONS)
+        self.file_registry: Dict[str, str] = {}
+
+    def update_registry(self, registry: dict):
+        ttls, mutating = dict(ACTION_CACHE_TTL), set(MUTATING_ACTIONS)
+
+        for module_actions in registry.get("modules", {}).values():
+            if not isinstance(module_actions, dict):
+                continue
+            for action, meta in module_actions.items():
+                if not isinstance(meta, dict):
+                    continue
+                if "cache_ttl" in meta:
+                    ttls[action] = meta["cache_ttl"]
+                if meta.get("mutates"):
+                    mutating.add(action)
+
+        self.ttls, self.mutating = ttls, mutating
+        self.file_registry = registry.get("file_registry", {})
+
+        # folders may have moved to other paths
+        self.cache.clear()
+
+
+    # ---------------- Lookups ----------------
+
+    def _key(self, action: str, params: dict):
+        return action, json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, action: str, params: dict) -> Dict[str, Any] | None:
+        if not self.ttls.get(action):
+            return None
+        entry = self.cache.get(self._key(action, params))
+        # callers store and may modify the data; the cached copy stays intact
+        return copy.deepcopy(entry[0]) if entry else None
+
+    def store(self, action: str, params: dict, response):
+        """Called with every response; caches the successful cacheable ones, invalidates on mutations."""
+        if action in self.mutating:
+            self.invalidate(params)
+            return
+
+        ttl = self.ttls.get(action)
+        if not ttl or not isinstance(response, dict):
+            return
+        if not (response.get("result") or {}).get("success"):
+            return
+
+        paths = {normalize_path(p) for p in self._paths(params)}
+        self.cache.set(self._key(action, params), (copy.deepcopy(response), paths), ttl)
+
+
+    # ---------------- Invalidation ----------------
+
+    def _paths(self, params) -> Iterator[str]:
+        """Path-like params, with file_registry keys ("projects") resolved to their paths."""
+        for value in iter_strings(params):
+            if value in self.file_registry:
+                yield str(self.file_registry[value])
+            elif looks_like_path(value):
+                yield value
+
+    def invalidate(self, params=None) -> int:
+        touched = {normalize_path(p) for p in self._paths(params or {})}
+
+        def related(_, entry):
+            paths = entry[1]
+            if not touched or not paths:
+                return True
+            return any(
+                a == b or a.startswith(b + "/") or b.startswith(a + "/")
+                for a in touched for b in paths
+            )
+
+        dropped = self.cache.invalidate(related)
+        if dropped:
+            logger.debug(f"Dropped {dropped} cached action results")
+        return dropped
+
+    def stats(self) -> dict:
+        return self.cache.stats()
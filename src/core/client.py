@@ -1,10 +1,199 @@
-import subprocess, httpx
+import asyncio, json, subprocess, time, uuid, httpx
+from configs.config import (
+    WIN_PORT, WIN_POOL_MAX_CONNECTIONS, WIN_POOL_MAX_KEEPALIVE, WIN_KEEPALIVE_EXPIRY,
+    WIN_USE_WEBSOCKET, WIN_WS_PATH, WIN_WS_RETRY_INTERVAL,
+    WIN_BREAKER_THRESHOLD, WIN_BREAKER_COOLDOWN,
+)
+from src.core.action_cache import ActionCache
 from src.core.logger import logger
+from src.core import tracing
+
+try:
+    import websockets
+    from websockets.exceptions import ConnectionClosed, InvalidHandshake
+except ImportError:
+    websockets = None
+
+
+
+class WebSocketChannel:
+    """
+    Single multiplexed WebSocket to the Windows listener.
+
+    Request frames:  {"id": <correlation id>, "action": ..., "params": {...}}
+    Reply frames:    {"id": <correlation id>, "response": {...}}
+    Frames without a known id are server pushes and go to the push handlers.
+    """
+
+    def __init__(self, url, push_handlers=None):
+        self.url = url
+        self.push_handlers = push_handlers if push_handlers is not None else []
+
+        self._ws = None
+        self._reader = None
+        self._pending = {}
+
+    @property
+    def is_open(self) -> bool:
+        return self._reader is not None and not self._reader.done()
+
+    async def connect(self, timeout=5):
+        self._ws = await websockets.connect(self.url, open_timeout=timeout)
+        self._reader = asyncio.create_task(self._read_loop())
+        logger.info(f"WebSocket channel open at {self.url}")
+
+    async def request(self, action, params, timeout=5):
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        try:
+            await self._ws.send(json.dumps({"id": request_id, "action": action, "params": params}))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _read_loop(self):
+        try:
+            async for raw in self._ws:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    logger.warning(f"Dropped malformed WebSocket frame: {raw!r}")
+                    continue
+
+                future = self._pending.get(message.get("id"))
+                if future is not None:
+                    if not future.done():
+                        future.set_result(message.get("response", {}))
+                    continue
+
+                for handler in self.push_handlers:
+                    try:
+                        handler(message)
+                    except Exception:
+                        logger.exception("WebSocket push handler failed")
+
+        except ConnectionClosed:
+            pass
+        finally:
+            logger.info("WebSocket channel closed")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("WebSocket channel closed"))
+            # the reader is gone, so is_open is False and a new socket will
+            # be opened; don't leave this one behind
+            await self._ws.close()
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive connect errors/timeouts to the Windows listener.
+
+    closed     calls go through
+    open       calls fail immediately, a background probe runs every cooldown
+    half_open  the probe is in flight, calls still fail fast until it answers
+    """
+
+    def __init__(self, threshold=WIN_BREAKER_THRESHOLD, cooldown=WIN_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probe = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != "closed"
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("Windows listener reachable again, closing circuit")
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, probe):
+        self.failures += 1
+        if self.state == "closed" and self.failures >= self.threshold:
+            logger.warning(f"Windows listener failed {self.failures} times in a row, opening circuit")
+            self.state = "open"
+            self.opened_at = time.time()
+
+        if self.state != "closed" and (self._probe is None or self._probe.done()):
+            self._probe = asyncio.create_task(self._run_probe(probe))
+
+    async def _run_probe(self, probe):
+        while self.state != "closed":
+            await asyncio.sleep(self.cooldown)
+            self.state = "half_open"
+            if await probe():
+                self.record_success()
+            else:
+                self.state = "open"
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened_at": self.opened_at,
+        }
+
+    async def close(self):
+        if self._probe is None:
+            return
+
+        loop = self._probe.get_loop()
+        if loop is asyncio.get_running_loop():
+            self._probe.cancel()
+            await asyncio.gather(self._probe, return_exceptions=True)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._probe.cancel)
+
 
 
 class WindowsClient:
-    def __init__(self):
-        self.base_url = f"http://{self._get_windows_ip()}:6001"
+    def __init__(
+        self,
+        max_connections=WIN_POOL_MAX_CONNECTIONS,
+        max_keepalive=WIN_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=WIN_KEEPALIVE_EXPIRY,
+        use_websocket=WIN_USE_WEBSOCKET,
+        base_url=None,
+    ):
+        self.base_url = base_url or f"http://{self._get_windows_ip()}:{WIN_PORT}"
+        self.ws_url = self.base_url.replace("http", "ws", 1) + WIN_WS_PATH
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+
+        # one pooled client/channel per event loop: startup runs on the main
+        # loop, requests are served from the uvicorn thread's loop
+        self._clients = {}
+        self._channels = {}
+        self._connect_locks = {}
+
+        if use_websocket and websockets is None:
+            logger.warning("websockets is not installed, using HTTP transport only")
+        self.use_websocket = use_websocket and websockets is not None
+        self._ws_retry_at = 0.0
+        self.push_handlers = []
+        self._batch_supported = True
+        self.breaker = CircuitBreaker()
+        self.action_cache = ActionCache()
 
     def _get_windows_ip(self):
         # WSL2 host IP is usually the default gateway
@@ -16,42 +205,250 @@ class WindowsClient:
         except Exception as e:
             logger.error("Unable to detect Windows host IP from WSL", exc_info=e)
             raise RuntimeError("Unable to detect Windows host IP from WSL") from e
-        
+
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits)
+            self._clients[loop] = client
+
+        return client
+
+
+    async def _get_channel(self, timeout) -> WebSocketChannel | None:
+        if not self.use_websocket or time.monotonic() < self._ws_retry_at:
+            return None
+
+        loop = asyncio.get_running_loop()
+        channel = self._channels.get(loop)
+        if channel is not None and channel.is_open:
+            return channel
+
+        # concurrent first calls share a single connection attempt
+        lock = self._connect_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            channel = self._channels.get(loop)
+            if channel is not None and channel.is_open:
+                return channel
+            if not self.use_websocket or time.monotonic() < self._ws_retry_at:
+                return None
+
+            channel = WebSocketChannel(self.ws_url, self.push_handlers)
+            try:
+                await channel.connect(timeout)
+            except InvalidHandshake as e:
+                # agent is up but has no WebSocket endpoint
+                logger.info(f"Windows listener does not support WebSocket, using HTTP: {e}")
+                self.use_websocket = False
+                return None
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"WebSocket connect failed, using HTTP for {WIN_WS_RETRY_INTERVAL}s: {e}")
+                self._ws_retry_at = time.monotonic() + WIN_WS_RETRY_INTERVAL
+                return None
+
+            self._channels[loop] = channel
+            return channel
+
+
+    def on_push(self, handler):
+        """Register a callback for messages pushed by the Windows listener."""
+        self.push_handlers.append(handler)
+        return handler
+
 
     async def trigger(self, action, params=None, timeout=5):
         # print("in trigger >>>>>>>>>>>", action, params)
         params = params or {}
-        url = f"{self.base_url}/action/{action}"
+
+        with tracing.span("windows.trigger", action=action) as span:
+            cached = self.action_cache.get(action, params)
+            if cached is not None:
+                logger.info(f"Served action '{action}' from cache with params: {params}")
+                span.set(outcome="cached")
+                return cached
+
+            response = await self._trigger(action, params, timeout)
+            self.action_cache.store(action, params, response)
+            span.set(outcome=self._outcome(response))
+            return response
+
+
+    async def _trigger(self, action, params, timeout):
+        if self.breaker.is_open:
+            return self._offline_error()
+
+        channel = await self._get_channel(timeout)
+        if channel is not None:
+            try:
+                response = await channel.request(action, params, timeout)
+                self.breaker.record_success()
+                logger.info(f"Triggered action '{action}' over WebSocket with params: {params}")
+                return response
+            except asyncio.TimeoutError:
+                logger.warning(f"Request timed out after {timeout}s for action '{action}'")
+                self.breaker.record_failure(self._probe)
+                return {"error": f"Request timed out after {timeout}s. Windows listener may be offline."}
+            except (ConnectionError, ConnectionClosed) as e:
+                logger.error(f"WebSocket request failed for action '{action}': {e}")
+                return {"error": f"Request failed: {e}"}
+
+        return await self._trigger_http(action, params, timeout)
+
+
+    async def _trigger_http(self, action, params, timeout):
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                resp = await client.post(url, json=params)
-                resp.raise_for_status()
-                logger.info(f"Triggered action '{action}' with params: {params}")
-                return resp.json()
+            resp = await self._get_client().post(f"/action/{action}", json=params, timeout=timeout)
+            self.breaker.record_success()
+            resp.raise_for_status()
+            logger.info(f"Triggered action '{action}' with params: {params}")
+            return resp.json()
         except httpx.TimeoutException:
             logger.warning(f"Request timed out after {timeout}s for action '{action}'")
+            self.breaker.record_failure(self._probe)
             return {"error": f"Request timed out after {timeout}s. Windows listener may be offline."}
         except httpx.ConnectError:
             logger.error(f"Cannot connect to Windows listener at {self.base_url}")
+            self.breaker.record_failure(self._probe)
             return {"error": "Cannot connect to Windows listener. Is it running?"}
         except httpx.HTTPStatusError as e:
             logger.error(f"Request failed for action '{action}': {str(e)}")
             return {"error": f"Request failed: {str(e)}"}
-        
+
+
+    async def trigger_many(self, actions, ordered=True, timeout=5):
+        """
+        Run several actions in one round trip.
+
+        actions: [{"action": name, "params": {...}}, ...]
+        Ordered batches run in sequence and stop at the first failed action,
+        unordered batches may run concurrently. Returns one response per
+        action that was run, in request order.
+        """
+        actions = [{"action": a["action"], "params": a.get("params") or {}} for a in actions]
+        if not actions:
+            return []
+        if self.breaker.is_open:
+            return [self._offline_error()]
+
+        # one /actions request whatever the transport: over the WebSocket an
+        # ordered batch would still cost a round trip per action
+        if self._batch_supported:
+            batch_timeout = timeout * len(actions) if ordered else timeout
+            with tracing.span("windows.trigger_many", actions=[a["action"] for a in actions]) as span:
+                try:
+                    resp = await self._get_client().post(
+                        "/actions",
+                        json={"ordered": ordered, "actions": actions},
+                        timeout=batch_timeout
+                    )
+                    if resp.status_code in (404, 405):
+                        logger.info("Windows listener does not support batched actions, sending one by one")
+                        self._batch_supported = False
+                        span.set(outcome="unsupported")
+                    else:
+                        self.breaker.record_success()
+                        resp.raise_for_status()
+                        logger.info(f"Triggered batch {[a['action'] for a in actions]}")
+                        results = resp.json()["results"]
+                        for a, response in zip(actions, results):
+                            self.action_cache.store(a["action"], a["params"], response)
+                        span.set(outcome=self._outcome(results[-1]) if results else "success")
+                        return results
+                except httpx.TimeoutException:
+                    logger.warning(f"Batch request timed out after {batch_timeout}s")
+                    span.set(outcome="error")
+                    self.breaker.record_failure(self._probe)
+                    return [{"error": f"Request timed out after {batch_timeout}s. Windows listener may be offline."}]
+                except httpx.ConnectError:
+                    logger.error(f"Cannot connect to Windows listener at {self.base_url}")
+                    span.set(outcome="error")
+                    self.breaker.record_failure(self._probe)
+                    return [{"error": "Cannot connect to Windows listener. Is it running?"}]
+                except httpx.HTTPStatusError as e:
+                    logger.error(f"Batch request failed: {str(e)}")
+                    span.set(outcome="error")
+                    return [{"error": f"Request failed: {str(e)}"}]
+
+        if not ordered:
+            return list(await asyncio.gather(
+                *(self.trigger(a["action"], a["params"], timeout) for a in actions)
+            ))
+
+        results = []
+        for a in actions:
+            response = await self.trigger(a["action"], a["params"], timeout)
+            results.append(response)
+            if not (response.get("result") or {}).get("success"):
+                break
+        return results
+
+
+    @staticmethod
+    def _outcome(response) -> str:
+        if not isinstance(response, dict) or "error" in response:
+            return "error"
+        return "success" if (response.get("result") or {}).get("success") else "failure"
+
+    def _offline_error(self):
+        return {"error": "Windows listener is offline (circuit open). Retrying in the background."}
+
+
+    async def _probe(self, timeout=2) -> bool:
+        # any HTTP answer means the listener is back, only transport errors count
+        try:
+            await self._get_client().get("/health", timeout=timeout)
+            return True
+        except httpx.RequestError:
+            return False
+
+
+    async def fetch_registry(self, etag=None, timeout=5):
+        """
+        Conditional registry fetch. Returns (registry, etag); registry is
+        None when the agent answers 304 Not Modified for the given etag.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        resp = await self._get_client().get("/registry", headers=headers, timeout=timeout)
+
+        if resp.status_code == 304:
+            return None, etag
+
+        resp.raise_for_status()
+        return resp.json(), resp.headers.get("ETag")
+
 
     async def load_registry(self, timeout=5):
-        url = f"{self.base_url}/registry"
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                logger.info("Loaded action registry")
-                return resp.json()
+            registry, _ = await self.fetch_registry(timeout=timeout)
+            logger.info("Loaded action registry")
+            return registry
 
-        except httpx.RequestError as e:
+        except httpx.HTTPError as e:
             logger.error(f"Failed to load registry from {self.base_url}: {str(e)}")
             return {}
-        
+
 
     async def close(self):
-        pass
+        current = asyncio.get_running_loop()
+        channels, self._channels = self._channels, {}
+        clients, self._clients = self._clients, {}
+        await self.breaker.close()
+
+        resources = [(loop, channel.close) for loop, channel in channels.items()]
+        resources += [(loop, client.aclose) for loop, client in clients.items()]
+
+        for loop, close in resources:
+            try:
+                if loop is current:
+                    await close()
+                elif loop.is_running():
+                    # connections belong to the other loop, close them there
+                    future = asyncio.run_coroutine_threadsafe(close(), loop)
+                    await asyncio.wrap_future(future)
+            except Exception as e:
+                logger.warning(f"Failed to close Windows client connection: {e}")
+
+        logger.info("Closed Windows client connections")
@@ -1,9 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from functools import partial
+import asyncio, multiprocessing, random, time
 from typing import List, Optional, Dict, Any
-from rapidfuzz import process
-from pathlib import Path
-import os
 
+from src.core.paths import PathResolver, is_windows_path, to_wsl_path
+from src.core.graph import Node, compile_graph
+from src.core.logger import logger
+from src.core import functions, tracing
+from configs.config import (
+    GRAPH_NODE_TIMEOUT, GRAPH_BACKOFF_MAX, FUNCTION_THREAD_WORKERS, FUNCTION_PROCESS_WORKERS,
+)
+
+
+_UNSET = object()
+
+
+class DeadlineExceeded(RuntimeError):
+    """Ends a graph run once its time budget is spent, instead of following on_failure."""
+
+    def __init__(self):
+        super().__init__("Deadline exceeded")
 
 
 @dataclass
@@ -17,10 +35,42 @@ class ExecutionResult:
 
 
 class Executor:
-    def __init__(self, controller_client, state_provider, file_registry):
+    # how function nodes run (a node's "kind" overrides this):
+    #   "cpu"    - the same-named function in src.core.functions, in a worker process
+    #   "io"     - the Executor method in a worker thread (default)
+    #   "inline" - the Executor method on the event loop
+    FUNCTION_KINDS = {
+        # process.cdist releases the GIL, and threads share one index cache
+        "fuzzy_select": "io",
+        "fuzzy_rank": "io",
+        "build_path": "io",
+    }
+
+    def __init__(self, controller_client, state_provider, file_registry, path_resolver=None):
         self.controller = controller_client
         self.state = state_provider
         self.file_registry = file_registry
+        self.paths = path_resolver or PathResolver()
+
+        self.thread_pool = ThreadPoolExecutor(FUNCTION_THREAD_WORKERS, thread_name_prefix="graph-fn")
+        self.process_pool = None    # spawned on the first "cpu" call
+
+    def _get_process_pool(self):
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=FUNCTION_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.process_pool
+
+    def close(self):
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+
+    def update_registry(self, registry: dict, diff: dict):
+        if diff["file_registry"]:
+            self.file_registry = registry.get("file_registry", {})
 
     async def execute(self, user_input: str, plan) -> ExecutionResult:
         try:
@@ -38,155 +88,351 @@ class Executor:
 
 
     async def _execute_graph(self, user_input, graph) -> ExecutionResult:
-        tg = graph["task_graph"]
-        nodes = tg["nodes"]
-        current = tg["entry"]
+        with tracing.span("executor.graph") as span:
+            result = await self._run_graph(user_input, graph)
+            span.set(outcome=result.status, graph=result.graph_id, nodes=len(result.executed_nodes))
+            return result
 
+    async def _run_graph(self, user_input, graph) -> ExecutionResult:
         executed: List[str] = []
         context: Dict[str, Any] = {"user_input": user_input}
 
+        # plain dict graphs (not from the Planner) are compiled on the fly
+        if isinstance(graph, dict):
+            try:
+                graph = compile_graph(graph).bind()
+            except Exception as e:
+                graph_id = graph.get("task_graph", {}).get("id")
+                return self._failure(graph_id, executed, None, str(e), context)
+
+        tg = graph.graph
+        context.update(graph.params)
+
+        deadline = time.monotonic() + tg.deadline
+        self.state.prefetch(tg.conditions, context)
+        outcome, node, error = await self._walk(tg.entry, context, executed, deadline)
+        if outcome == "done":
+            return self._success(tg.id, executed, context)
+
+        return self._failure(
+            tg.id,
+            executed,
+            node.id if node else None,
+            error,
+            context
+        )
+
+
+    async def _walk(self, node: Node, context, executed, deadline: float, stop: Node | None = None):
+        """
+        Runs nodes from `node` until a noop/abort node, or until `stop` (the
+        join node, for parallel branches). Returns (outcome, last node, error)
+        with outcome "done" or "failed". Past the deadline (time.monotonic()),
+        action/function nodes take their on_failure edge without running.
+        """
         try:
             while True:
-                if current not in nodes:
-                    raise RuntimeError(f"Unknown node: {current}")
+                if node is None:
+                    raise RuntimeError(f"Missing successor after node: {executed[-1]}")
 
-                node = nodes[current]
-                executed.append(current)
+                if node is stop:
+                    return "done", node, None
 
-                node_type = node["type"]
+                executed.append(node.id)
+                node_type = node.type
+
+                # release intermediate values no later node reads
+                for key in node.dead:
+                    context.pop(key, None)
 
                 # --- NOOP ---
                 if node_type == "noop":
-                    return self._success(tg["id"], executed, context)
+                    if stop is not None:
+                        # a branch only succeeds by reaching its join
+                        return "failed", node, f"Branch ended at '{node.id}' before its join"
+                    return "done", node, None
 
                 # --- ABORT ---
                 if node_type == "abort":
-                    return self._failure(
-                        tg["id"],
-                        executed,
-                        current,
-                        node.get("reason", "Aborted"),
-                        context
-                    )
+                    return "failed", node, node.resolve_reason(context)
+
+                if node_type in ("decision", "parallel") and time.monotonic() >= deadline:
+                    return "failed", node, "Deadline exceeded"
 
                 # --- DECISION ---
                 if node_type == "decision":
-                    result = self.state.evaluate(
-                        node["condition"],
-                        context=context
-                    )
-                    current = node["on_true"] if result else node["on_false"]
+                    with tracing.span("node", node=node.id, type=node_type, condition=node.condition) as span:
+                        result = await self.state.evaluate(
+                            node.condition,
+                            context=context
+                        )
+                        span.set(outcome=str(bool(result)).lower())
+                    node = node.on_true if result else node.on_false
+                    continue
+
+                # --- PARALLEL ---
+                if node_type == "parallel":
+                    with tracing.span("node", node=node.id, type=node_type, mode=node.mode):
+                        node = await self._execute_parallel(node, context, executed, deadline)
                     continue
 
                 # --- ACTION ---
                 if node_type == "action":
-                    retries = node.get("retries", 0)
-                    output_key = node.get("output")
-                    fetch = node.get("fetch", None)
-
-                    resolved_args = self._resolve_args(
-                        node.get("args", {}),
-                        context
-                    )
-
-                    last_error = None
-                    for _ in range(retries + 1):
-                        response = await self.controller.trigger(
-                            action=node["controller"],
-                            params=resolved_args
-                        )
-
-
-                        if not isinstance(response, dict):
-                            raise RuntimeError(
-                                f"Controller '{node['controller']}' must return dict"
-                            )
-                        
-                        result = response["result"]
-                        if result.get("success"):
-                            if output_key:
-                                data = result["data"].get(fetch) if fetch else result.get("data")
-                                context[output_key] = data
-                            current = node["on_success"]
-                            break
-                        else:
-                            last_error = response.get("error")
-
-                    else:
-                        current = node["on_failure"]
-
+                    # every action fails without awaiting while the listener
+                    # is offline; a retry cycle would spin until the deadline
+                    breaker = getattr(self.controller, "breaker", None)
+                    if breaker is not None and breaker.is_open:
+                        return "failed", node, "Windows listener is offline (circuit open)"
+
+                    batch = self._collect_batch(node)
+                    if batch:
+                        node = await self._execute_batch(batch, executed, context, deadline)
+                        continue
+
+                    resolved_args = node.resolve_args(context)
+                    node = await self._attempts(node, deadline, self._action_attempt, resolved_args, context)
                     continue
                 
                 
                 if node_type == "function":
-                    retries = node.get("retries", 0)
-                    output_key = node.get("output")
-
-                    resolved_args = self._resolve_args(
-                        node.get("args", {}),
-                        context
-                    )
-
-                    last_error = None
-                    for _ in range(retries + 1):
-                        fn = getattr(self, node["controller"])
-                        response = fn(**resolved_args)
-
-                        if response:
-                            if output_key:
-                                context[output_key] = response
-                            current = node["on_success"]
-                            break
-                        else:
-                            last_error = response.get("error")
-
-                    else:
-                        current = node["on_failure"]
-
+                    resolved_args = node.resolve_args(context)
+                    node = await self._attempts(node, deadline, self._function_attempt, resolved_args, context)
                     continue
 
+                # joins are only reached through their parallel node
                 raise RuntimeError(f"Unsupported node type: {node_type}")
 
         except Exception as e:
-            return self._failure(
-                tg["id"],
-                executed,
-                current,
-                str(e),
-                context
-            )
+            return "failed", node, str(e)
 
-    # ---------------- HELPERS ----------------
 
-    def _resolve_args(self, args: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
-        resolved = {}
+    # ---------------- PARALLEL ----------------
+
+    async def _execute_parallel(self, node: Node, context, executed, deadline) -> Node:
+        """
+        Runs every branch of a parallel node concurrently up to its join node,
+        merges the branch outputs into the context and returns the join's
+        successor. "fail_fast" cancels the other branches on the first
+        failure; "collect_all" lets them finish. Branch errors are stored
+        under the join's output key.
+        """
+        join = node.join
+        contexts = [dict(context) for _ in node.branches]
+        branch_executed = [[] for _ in node.branches]
+        tasks = []
+
+        async def run_branch(i, start):
+            result = await self._walk(start, contexts[i], branch_executed[i], deadline, stop=join)
+            if result[0] != "done" and node.mode == "fail_fast":
+                for task in tasks:
+                    if task is not asyncio.current_task():
+                        task.cancel()
+            return result
+
+        tasks.extend(
+            asyncio.create_task(run_branch(i, start))
+            for i, start in enumerate(node.branches)
+        )
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        errors = {}
+        for start, branch_context, steps, result in zip(node.branches, contexts, branch_executed, results):
+            executed.extend(steps)
+
+            if isinstance(result, asyncio.CancelledError):
+                errors[start.id] = "cancelled"
+                continue
+            if isinstance(result, BaseException):
+                raise result
+
+            outcome, _, error = result
+            if outcome != "done":
+                errors[start.id] = error
+                continue
+
+            for key, value in branch_context.items():
+                if context.get(key, _UNSET) is not value:
+                    context[key] = value
+
+        executed.append(join.id)
+        for key in join.dead:
+            context.pop(key, None)
+
+        if errors:
+            if join.output:
+                context[join.output] = errors
+            tracing.annotate(outcome="failure", errors=errors)
+            return join.on_failure
+        tracing.annotate(outcome="success")
+        return join.on_success
+
+
+    # ---------------- BATCHING ----------------
+
+    def _collect_batch(self, start: Node) -> List[Node]:
+        """
+        Chain of action nodes linked by on_success that can go to the
+        controller in one request: no node reads an output produced earlier
+        in the chain, and none has retries.
+        """
+        if not hasattr(self.controller, "trigger_many"):
+            return []
+
+        batch: List[Node] = []
+        produced = set()
+        node = start
+
+        while node is not None and node not in batch:
+            if node.type != "action" or node.retries:
+                break
+            if produced & node.refs:
+                break
+
+            batch.append(node)
+            if node.output:
+                produced.add(node.output)
+            node = node.on_success
+
+        return batch if len(batch) > 1 else []
+
+    async def _execute_batch(self, batch: List[Node], executed, context, deadline) -> Node | None:
+        """Run a batch as an ordered trigger_many and return the next node."""
+        # per-action timeout; the batch as a whole stays within its share of the budget
+        timeout = min(
+            max(node.timeout or GRAPH_NODE_TIMEOUT for node in batch),
+            (deadline - time.monotonic()) / batch[0].steps,
+        )
+        with tracing.span("batch", nodes=[node.id for node in batch]) as span:
+            if timeout <= 0:
+                logger.warning(f"Deadline exceeded before node '{batch[0].id}'")
+                span.set(outcome="deadline")
+                raise DeadlineExceeded()
+
+            actions = [
+                {"action": node.controller, "params": node.resolve_args(context)}
+                for node in batch
+            ]
+            for node in batch[1:]:
+                for key in node.dead:
+                    context.pop(key, None)
+
+            responses = await self.controller.trigger_many(actions, ordered=True, timeout=timeout)
 
-        for key, value in args.items():
-            if isinstance(value, str) and value.startswith("@"):
-                resolved[key] = self._resolve_reference(value, context)
-            else:
-                resolved[key] = value
+            for i, node in enumerate(batch):
+                if i:
+                    executed.append(node.id)
 
-        return resolved
+                # ordered batches stop at the first failure, so it is the last response
+                if not self._store_action_output(node, responses[i], context):
+                    span.set(outcome="failure", failed_node=node.id)
+                    return node.on_failure
 
-    def _resolve_reference(self, ref: str, context: Dict[str, Any]) -> Any:
+            span.set(outcome="success")
+            return batch[-1].on_success
+
+    # ---------------- ATTEMPTS ----------------
+
+    async def _attempts(self, node: Node, deadline, attempt, args, context) -> Node | None:
+        """
+        Runs attempt(node, args, context, timeout) up to retries + 1 times,
+        with exponential backoff between tries, and returns the next node.
+        Each try gets the node's timeout, capped by its share of the time left
+        before the deadline. Once the budget is spent the run ends with
+        DeadlineExceeded: following on_failure could loop through a retry
+        cycle without ever awaiting.
+        """
+        with tracing.span("node", node=node.id, type=node.type, controller=node.controller) as span:
+            outcome = "failure"
+            for n in range(node.retries + 1):
+                remaining = deadline - time.monotonic()
+                timeout = min(node.timeout or GRAPH_NODE_TIMEOUT, remaining / node.steps)
+                if timeout <= 0:
+                    logger.warning(f"Deadline exceeded at node '{node.id}'")
+                    span.set(outcome="deadline")
+                    raise DeadlineExceeded()
+
+                span.set(attempts=n + 1)
+                if await attempt(node, args, context, timeout):
+                    span.set(outcome="success")
+                    return node.on_success
+
+                if n < node.retries and node.backoff:
+                    delay = min(node.backoff * 2 ** n, GRAPH_BACKOFF_MAX)
+                    delay *= 1 + random.uniform(-node.jitter, node.jitter)
+                    if delay >= deadline - time.monotonic():
+                        outcome = "deadline"
+                        break
+                    await asyncio.sleep(delay)
+
+            span.set(outcome=outcome)
+
+        # a failure that never suspended (e.g. an inline function) must not
+        # starve the loop when on_failure cycles back
+        await asyncio.sleep(0)
+        return node.on_failure
+
+    async def _action_attempt(self, node: Node, args, context, timeout) -> bool:
+        response = await self.controller.trigger(
+            action=node.controller,
+            params=args,
+            timeout=timeout
+        )
+        return self._store_action_output(node, response, context)
+
+    async def _function_attempt(self, node: Node, args, context, timeout) -> bool:
+        try:
+            response = await asyncio.wait_for(self._call_function(node, args), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Function node '{node.id}' timed out after {timeout:.2f}s")
+            return False
+        if not response:
+            return False
+        if node.output:
+            context[node.output] = response
+        return True
+
+
+    async def _call_function(self, node: Node, args):
         """
-        @var
-        @var::field
+        Dispatches a function node by kind. Cancelling the await (timeout,
+        fail-fast branch) drops calls still queued; a call already running in
+        a worker finishes in the background and its result is discarded.
         """
-        path = ref[1:].split("::")
-        value = context.get(path[0])
+        kind = node.kind or self.FUNCTION_KINDS.get(node.controller, "io")
+        loop = asyncio.get_running_loop()
 
-        if value is None:
-            raise RuntimeError(f"Context value not found: {path[0]}")
+        if kind == "cpu":
+            fn = partial(getattr(functions, node.controller), **args)
+            try:
+                return await loop.run_in_executor(self._get_process_pool(), fn)
+            except BrokenProcessPool:
+                # a crashed worker takes the pool down; start a fresh one for the next call
+                self.process_pool = None
+                raise
 
-        for part in path[1:]:
-            if isinstance(value, dict):
-                value = value.get(part)
-            else:
-                raise RuntimeError(f"Cannot access '{part}' on non-dict value")
+        fn = partial(getattr(self, node.controller), **args)
+        if kind == "io":
+            return await loop.run_in_executor(self.thread_pool, fn)
+        return fn()
 
-        return value
+
+    # ---------------- HELPERS ----------------
+
+    def _store_action_output(self, node: Node, response, context) -> bool:
+        if not isinstance(response, dict):
+            raise RuntimeError(
+                f"Controller '{node.controller}' must return dict"
+            )
+
+        # transport errors come back as {"error": ...} without a result
+        result = response.get("result") or {}
+        if not result.get("success"):
+            return False
+
+        if node.output:
+            data = result["data"].get(node.fetch) if node.fetch else result.get("data")
+            context[node.output] = data
+        return True
 
     def _success(self, graph_id, executed, context):
         return ExecutionResult(
@@ -210,28 +456,25 @@ class Executor:
 
 
 
-    def fuzzy_select(self, query, choices):
-        match, score, idx = process.extractOne(query, choices)
-        return match
+    def fuzzy_select(self, query, choices, **kwargs):
+        return functions.fuzzy_select(query, choices, **kwargs)
+
+    def fuzzy_rank(self, query, choices, **kwargs):
+        return functions.fuzzy_rank(query, choices, **kwargs)
 
     def build_path(self, parent_name: str = None, folder: str = None, path: str = None) -> str:
         if path:
             path = path.strip()
 
             # Convert Windows path → WSL accessible
-            if ":" in path and "\\" in path:
-                # Windows → /mnt/c style
-                drive = path[0].lower()
-                rest = path[2:].replace("\\", "/")
-                wsl_path = f"/mnt/{drive}/{rest}"
-
-                # optional check (works in WSL for both files/folders)
-                exists = os.path.exists(wsl_path)
+            if is_windows_path(path):
+                wsl_path = to_wsl_path(path)
 
-                return wsl_path if exists else path  # fallback to original
+                # optional check (works in WSL for both files/folders), cached
+                return wsl_path if self.paths.exists(wsl_path) else path  # fallback to original
 
             # Already WSL-style path
-            if path.startswith("/") and os.path.exists(path):
+            if path.startswith("/") and self.paths.exists(path):
                 return path
 
             return path
@@ -261,11 +504,8 @@ class Executor:
 
             # Windows-style path: C:\projects
             if ":" in base_str:
-                win = str(Path(base_str) / folder)
                 # Convert to WSL so WSL-side can verify load-it
-                drive = win[0].lower()
-                rest = win[2:].replace("\\", "/")
-                return f"/mnt/{drive}/{rest}"
+                return f"{to_wsl_path(base_str).rstrip('/')}/{folder}"
 
             raise ValueError(f"Unrecognized path format: {base_str}")
 
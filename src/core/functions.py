@@ -0,0 +1,91 @@
+"""
+Task graph functions that can run in a worker process.
+
+They take and return plain picklable values and import nothing from the
+running backend (configs only), so a spawned worker only pays for rapidfuzz.
+Caches such as the fuzzy indexes live per process.
+"""
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+import threading
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+from configs.config import FUZZY_SCORE_CUTOFF, FUZZY_INDEX_CACHE_SIZE, FUZZY_WORKERS
+
+
+
+# ---------------- Fuzzy selection ----------------
+
+def normalize(text: str) -> str:
+    """Lowercased, punctuation-free, token-sorted: "Jarvis-Backend" -> "backend jarvis"."""
+    return " ".join(sorted(utils.default_process(text).split()))
+
+
+class FuzzyIndex:
+    """
+    A choice list preprocessed once, scored in one process.cdist call per
+    query. token_set_ratio scores a choice whose words all appear in the
+    utterance ("start jarvis backend project" vs "jarvis-backend") at 100,
+    whatever the filler words around them.
+    """
+
+    def __init__(self, choices: Sequence[str], workers: int = FUZZY_WORKERS):
+        self.choices = tuple(choices)
+        self.processed = [normalize(choice) for choice in self.choices]
+        self.workers = workers
+
+    def top(self, query: str, limit: int = 5, score_cutoff: float = FUZZY_SCORE_CUTOFF) -> List[Tuple[str, float]]:
+        """Best `limit` (choice, score) pairs at or above score_cutoff, highest first."""
+        if not self.choices or limit <= 0:
+            return []
+
+        scores = process.cdist(
+            [normalize(query)], self.processed,
+            scorer=fuzz.token_set_ratio, processor=None,
+            score_cutoff=score_cutoff, workers=self.workers,
+        )[0]
+
+        if limit < len(scores):
+            candidates = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(scores))
+        # highest score first, earlier choice first on ties (like extractOne)
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
+
+        return [
+            (self.choices[i], float(scores[i]))
+            for i in ranked
+            if scores[i] > 0 and scores[i] >= score_cutoff
+        ]
+
+
+# choice list -> FuzzyIndex; a changed listing is a new key, old ones age out
+_indexes: OrderedDict = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def fuzzy_index(choices: Sequence[str]) -> FuzzyIndex:
+    key = tuple(choices)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = FuzzyIndex(key)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > FUZZY_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def fuzzy_rank(query, choices, limit=5, score_cutoff=FUZZY_SCORE_CUTOFF):
+    return fuzzy_index(choices).top(query, limit, score_cutoff)
+
+
+def fuzzy_select(query, choices, score_cutoff=FUZZY_SCORE_CUTOFF):
+    """Best match, or None (the node fails) when nothing reaches the cutoff."""
+    best = fuzzy_rank(query, choices, 1, score_cutoff)
+    return best[0][0] if best else None
@@ -0,0 +1,508 @@
+"""
+Compiled task graphs.
+
+Templates are built and validated once at startup into immutable objects:
+node ids are interned, successors are direct Node references, and each
+node's "@var::field" arguments and abort reason are compiled into resolver
+closures. Template parameters reach the builders as "@param" strings, so
+they also work inside f-string text. Per request the Planner only
+binds parameters (BoundGraph); the Executor walks the linked nodes.
+
+`analyze_graph` rejects graphs with unreachable nodes, missing successors,
+cycles that can never reach a terminal node, or "@var" references that are
+not defined on every path into the node. It also computes context liveness:
+`node.dead` lists the node outputs nobody reads after that point, which the
+Executor drops from the context when it reaches the node.
+"""
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
+import re, sys
+
+from configs.config import GRAPH_DEADLINE
+from src.core.logger import logger
+
+
+
+# "@var::field" inside free text such as an abort reason
+TEXT_REFERENCE = re.compile(r"(?<![\w@])@(\w+(?:::\w+)*)(?!::)")
+# task_graph fields shown to the user, rendered with the bound params
+TEXT_FIELDS = ("goal", "description")
+
+NODE_TYPES = {"action", "function", "decision", "parallel", "join", "noop", "abort"}
+PARALLEL_MODES = {"fail_fast", "collect_all"}
+FUNCTION_KINDS = {None, "cpu", "io", "inline"}
+SUCCESSOR_KEYS = ("on_success", "on_failure", "on_true", "on_false")
+
+# successors each node type must have
+REQUIRED_SUCCESSORS = {
+    "action": ("on_success", "on_failure"),
+    "function": ("on_success", "on_failure"),
+    "decision": ("on_true", "on_false"),
+    "parallel": ("join",),
+    "join": ("on_success", "on_failure"),
+    "noop": (),
+    "abort": (),
+}
+
+
+# ---------------- Argument references ----------------
+
+def compile_reference(ref: str, refs: set):
+    """"@var" / "@var::field::..." -> resolver(context)."""
+    root, *fields = ref[1:].split("::")
+    if not root or not all(fields):
+        raise ValueError(f"Invalid reference {ref!r}")
+
+    root = sys.intern(root)
+    refs.add(root)
+
+    def lookup(context):
+        value = context.get(root)
+        if value is None:
+            raise RuntimeError(f"Context value not found: {root}")
+        return value
+
+    if not fields:
+        return lookup
+
+    def lookup_fields(context):
+        value = lookup(context)
+        for part in fields:
+            if not isinstance(value, dict):
+                raise RuntimeError(f"Cannot access '{part}' on non-dict value")
+            value = value.get(part)
+        return value
+
+    return lookup_fields
+
+
+def compile_value(value, refs: set):
+    """
+    Compiles an argument value into resolver(context), or None when it holds
+    no references and can be passed as is. Strings may also embed references
+    in longer text, like template params interpolated by a builder. Dicts and lists are compiled
+    recursively; only their dynamic entries are resolved per call.
+    """
+    if isinstance(value, str):
+        # a whole-value reference passes the value through unconverted;
+        # embedded ones ("C:\\@folder_name") render into the text
+        if TEXT_REFERENCE.fullmatch(value) or (value.startswith("@") and not TEXT_REFERENCE.match(value)):
+            return compile_reference(value, refs)
+        return compile_text(value, refs)
+
+    if isinstance(value, dict):
+        dynamic = [(key, compile_value(item, refs)) for key, item in value.items()]
+        dynamic = [(key, resolver) for key, resolver in dynamic if resolver]
+        if not dynamic:
+            return None
+
+        def resolve_dict(context):
+            resolved = dict(value)
+            for key, resolver in dynamic:
+                resolved[key] = resolver(context)
+            return resolved
+
+        return resolve_dict
+
+    if isinstance(value, (list, tuple)):
+        resolvers = [compile_value(item, refs) for item in value]
+        if not any(resolvers):
+            return None
+
+        def resolve_list(context):
+            return [
+                resolver(context) if resolver else item
+                for resolver, item in zip(resolvers, value)
+            ]
+
+        return resolve_list
+
+    return None
+
+
+def compile_text(text: str, refs: set):
+    """
+    Compiles text with embedded references ("@folder_name player setup
+    failed") into render(context) -> str, or None when it has none.
+    """
+    parts = TEXT_REFERENCE.split(text)
+    if len(parts) == 1:
+        return None
+
+    literals = parts[0::2]
+    lookups = [compile_reference("@" + ref, refs) for ref in parts[1::2]]
+
+    def render(context):
+        out = [literals[0]]
+        for lookup, literal in zip(lookups, literals[1:]):
+            out.append(str(lookup(context)))
+            out.append(literal)
+        return "".join(out)
+
+    return render
+
+
+
+class Node:
+    __slots__ = (
+        "id", "type", "controller", "args", "output", "fetch", "retries",
+        "condition", "reason", "resolve_reason", "refs", "resolve_args", "spec", "live", "dead",
+        "branches", "join", "mode", "timeout", "backoff", "jitter", "kind", "steps",
+        "on_success", "on_failure", "on_true", "on_false",
+    )
+
+    def __init__(self, node_id: str, spec: Mapping[str, Any]):
+        self.id = sys.intern(node_id)
+        self.type = spec["type"]
+        self.controller = spec.get("controller")
+        self.args = MappingProxyType(dict(spec.get("args", {})))
+        self.output = spec.get("output")
+        self.fetch = spec.get("fetch")
+        self.retries = spec.get("retries", 0)
+        self.timeout = spec.get("timeout")          # seconds per attempt
+        self.backoff = spec.get("backoff", 0)       # first retry delay, doubles per attempt
+        self.jitter = spec.get("jitter", 0)         # +/- fraction of the delay
+        self.kind = spec.get("kind")                # function nodes: "cpu" | "io" | "inline"
+        self.condition = spec.get("condition")
+        self.reason = spec.get("reason", "Aborted")
+        self.mode = spec.get("mode", "fail_fast")
+        self.spec = spec
+
+        # resolve_args(context) -> args with "@var" / "@var::field" references filled in
+        refs = set()
+        resolver = compile_value(dict(self.args), refs)
+        self.resolve_args = resolver or self._constant_args
+        # abort reasons may mention template params too
+        self.resolve_reason = compile_text(self.reason, refs) or self._constant_reason
+        self.refs = frozenset(refs)
+
+        # linked by compile_graph
+        self.on_success = self.on_failure = self.on_true = self.on_false = None
+        self.join = None
+        self.branches = ()
+
+        # set by analyze_graph
+        self.live = self.dead = frozenset()
+        self.steps = 0
+
+    def _constant_args(self, context):
+        return dict(self.args)
+
+    def _constant_reason(self, context):
+        return self.reason
+
+    def successors(self):
+        """(edge, node) pairs; a parallel node's edges are its branches."""
+        edges = [("branch", branch) for branch in self.branches]
+        edges += [
+            (key, getattr(self, key)) for key in SUCCESSOR_KEYS
+            if getattr(self, key) is not None
+        ]
+        return edges
+
+    def __repr__(self):
+        return f"Node({self.id!r}, {self.type!r})"
+
+
+class CompiledGraph:
+    __slots__ = ("id", "version", "entry", "nodes", "params", "deadline", "conditions", "spec")
+
+    def __init__(self, graph_id, version, entry, nodes, params, deadline, spec):
+        self.id = graph_id
+        self.version = version
+        self.entry = entry
+        self.nodes = nodes
+        self.params = params
+        self.deadline = deadline
+        self.spec = spec
+
+        # decision conditions, probed up front when the graph starts
+        self.conditions = frozenset(
+            node.condition for node in nodes.values() if node.type == "decision"
+        )
+
+    def bind(self, params: Dict[str, Any] | None = None) -> "BoundGraph":
+        params = params or {}
+        missing = self.params - params.keys()
+        if missing:
+            raise ValueError(f"Missing parameters for graph '{self.id}': {sorted(missing)}")
+        return BoundGraph(self, params)
+
+
+class BoundGraph:
+    """A compiled graph plus the parameters of one request; params seed the context."""
+    __slots__ = ("graph", "params")
+
+    def __init__(self, graph: CompiledGraph, params: Dict[str, Any]):
+        self.graph = graph
+        self.params = params
+
+    def spec(self) -> dict:
+        """The graph spec with its goal/description rendered for these params."""
+        tg = dict(self.graph.spec["task_graph"])
+        for key in TEXT_FIELDS:
+            render = compile_text(tg[key], set()) if isinstance(tg.get(key), str) else None
+            if render is not None:
+                try:
+                    tg[key] = render(self.params)
+                except RuntimeError:
+                    pass
+        return {**self.graph.spec, "task_graph": tg}
+
+
+
+def compile_graph(spec: dict, params=()) -> CompiledGraph:
+    """Validates a {"version", "task_graph": {...}} dict and links its nodes."""
+    tg = spec["task_graph"]
+    graph_id = tg.get("id", "?")
+    node_specs = tg.get("nodes", {})
+
+    if tg.get("entry") not in node_specs:
+        raise ValueError(f"Graph '{graph_id}': invalid entry node {tg.get('entry')!r}")
+
+    nodes = {}
+    for node_id, node_spec in node_specs.items():
+        if node_spec.get("type") not in NODE_TYPES:
+            raise ValueError(f"Graph '{graph_id}': node '{node_id}' has unsupported type {node_spec.get('type')!r}")
+        if node_spec.get("kind") not in FUNCTION_KINDS:
+            raise ValueError(f"Graph '{graph_id}': node '{node_id}' has unknown kind {node_spec.get('kind')!r}")
+        try:
+            nodes[node_id] = Node(node_id, node_spec)
+        except ValueError as e:
+            raise ValueError(f"Graph '{graph_id}': node '{node_id}': {e}") from None
+
+    for node in nodes.values():
+        for key in SUCCESSOR_KEYS:
+            target = node.spec.get(key)
+            if target is None:
+                continue
+            if target not in nodes:
+                raise ValueError(f"Graph '{graph_id}': node '{node.id}' {key} -> unknown node '{target}'")
+            setattr(node, key, nodes[target])
+
+        if node.type == "parallel":
+            link_parallel(graph_id, node, nodes)
+
+    analyze_graph(graph_id, nodes[tg["entry"]], nodes, params)
+
+    return CompiledGraph(
+        graph_id=sys.intern(graph_id),
+        version=spec.get("version"),
+        entry=nodes[tg["entry"]],
+        nodes=MappingProxyType(nodes),
+        params=frozenset(params),
+        deadline=tg.get("deadline", GRAPH_DEADLINE),
+        spec=spec,
+    )
+
+
+def link_parallel(graph_id: str, node: Node, nodes: Dict[str, Node]):
+    branches = node.spec.get("branches", [])
+    join = node.spec.get("join")
+
+    if node.mode not in PARALLEL_MODES:
+        raise ValueError(f"Graph '{graph_id}': node '{node.id}' has unknown mode {node.mode!r}")
+    if not branches:
+        raise ValueError(f"Graph '{graph_id}': parallel node '{node.id}' has no branches")
+
+    for target in [*branches, join]:
+        if target not in nodes:
+            raise ValueError(f"Graph '{graph_id}': node '{node.id}' -> unknown node '{target}'")
+    if nodes[join].type != "join":
+        raise ValueError(f"Graph '{graph_id}': node '{node.id}' joins on non-join node '{join}'")
+
+    node.branches = tuple(nodes[target] for target in branches)
+    node.join = nodes[join]
+
+
+def analyze_graph(graph_id: str, entry: Node, nodes: Dict[str, Node], params=()):
+    """Raises ValueError for graphs that cannot run correctly; sets node.live / node.dead."""
+    for node in nodes.values():
+        for key in REQUIRED_SUCCESSORS[node.type]:
+            if getattr(node, key) is None:
+                raise ValueError(f"Graph '{graph_id}': node '{node.id}' has no {key}")
+
+    # reachability from the entry
+    reachable = {entry}
+    order = [entry]
+    for node in order:
+        for _, succ in node.successors():
+            if succ not in reachable:
+                reachable.add(succ)
+                order.append(succ)
+
+    unreachable = sorted(n.id for n in nodes.values() if n not in reachable)
+    if unreachable:
+        raise ValueError(f"Graph '{graph_id}': unreachable nodes {unreachable}")
+
+    # a branch may only leave through its join, or abort: any other exit
+    # would run nodes after the join inside the branch
+    joins = {}
+    regions = {}
+    for node in order:
+        if node.type != "parallel":
+            continue
+        if joins.setdefault(node.join, node) is not node:
+            raise ValueError(f"Graph '{graph_id}': join '{node.join.id}' is shared by several parallel nodes")
+        regions[node.join] = [_region(branch, node.join) for branch in node.branches]
+
+        for branch, region in zip(node.branches, regions[node.join]):
+            for inner in region:
+                if inner.type == "abort":
+                    continue
+                if inner.type == "noop" or not _reaches(inner, node.join):
+                    raise ValueError(
+                        f"Graph '{graph_id}': branch '{branch.id}' can leave through '{inner.id}' "
+                        f"without reaching join '{node.join.id}'"
+                    )
+
+    predecessors = {node: [] for node in order}
+    for node in order:
+        for key, succ in node.successors():
+            predecessors[succ].append((node, key))
+
+    # every node must be able to reach noop/abort, otherwise it loops forever
+    exits = {n for n in order if n.type in ("noop", "abort")}
+    stack = list(exits)
+    while stack:
+        for pred, _ in predecessors[stack.pop()]:
+            if pred not in exits:
+                exits.add(pred)
+                stack.append(pred)
+
+    trapped = sorted(n.id for n in order if n not in exits)
+    if trapped:
+        raise ValueError(f"Graph '{graph_id}': cycle without exit through {trapped}")
+
+    # keys defined on every path into a node (outputs are only set on success)
+    inputs = frozenset(params) | {"user_input"}
+    outputs = frozenset(n.output for n in order if n.output)
+    everything = inputs | outputs
+
+    def leaving(pred, key):
+        if pred.type == "join":
+            # on success every branch got merged; on failure some did not,
+            # and the join's output holds the branch errors
+            if key == "on_failure":
+                return defined[joins[pred]] | ({pred.output} if pred.output else set())
+            return defined[pred]
+        if key == "on_success" and pred.output:
+            return defined[pred] | {pred.output}
+        return defined[pred]
+
+    defined = {node: everything for node in order}
+    defined[entry] = inputs
+    changed = True
+    while changed:
+        changed = False
+        for node in order:
+            if node is entry:
+                continue
+            if node.type == "join":
+                # within a branch, what every edge into the join defines (a
+                # failing branch node that jumps to the join counts as
+                # success); across branches, the merge of all of them
+                incoming = frozenset().union(*(
+                    frozenset.intersection(*(
+                        leaving(pred, key) for pred, key in predecessors[node] if pred in region
+                    ))
+                    for region in regions[node]
+                ))
+            else:
+                incoming = frozenset.intersection(*(
+                    leaving(pred, key) for pred, key in predecessors[node]
+                ))
+            if incoming != defined[node]:
+                defined[node] = incoming
+                changed = True
+
+    for node in order:
+        missing = node.refs - defined[node]
+        if missing:
+            raise ValueError(
+                f"Graph '{graph_id}': node '{node.id}' reads {sorted('@' + k for k in missing)} "
+                f"before it is defined on every path"
+            )
+
+    # liveness: keys some node reachable from here (itself included) reads
+    live = {node: node.refs for node in order}
+    changed = True
+    while changed:
+        changed = False
+        for node in reversed(order):
+            merged = node.refs.union(*(live[succ] for _, succ in node.successors()))
+            if merged != live[node]:
+                live[node] = merged
+                changed = True
+
+    _count_steps(entry)
+
+    # only intermediate outputs are dropped; inputs and final results stay.
+    # dead = what was live in some predecessor but no longer is here
+    consumed = outputs & frozenset().union(*(n.refs for n in order))
+    for node in order:
+        node.live = frozenset(live[node])
+        before = frozenset().union(*(live[pred] for pred, _ in predecessors[node]))
+        node.dead = (consumed & before) - node.live
+
+
+def _count_steps(entry: Node):
+    """node.steps: most action/function nodes left on any path from the node (cycles cut)."""
+    done, on_stack = set(), set()
+
+    def visit(node):
+        if node in done or node in on_stack:
+            return node.steps
+        on_stack.add(node)
+        node.steps = max((visit(succ) for _, succ in node.successors()), default=0)
+        if node.type in ("action", "function"):
+            node.steps += 1
+        on_stack.discard(node)
+        done.add(node)
+        return node.steps
+
+    visit(entry)
+
+
+def _region(start: Node, stop: Node) -> dict:
+    """Nodes reachable from `start` without going through `stop`, in breadth-first order."""
+    seen = {start: None}
+    queue = [start]
+    for node in queue:
+        for _, succ in node.successors():
+            if succ is not stop and succ not in seen:
+                seen[succ] = None
+                queue.append(succ)
+    return seen
+
+
+def _reaches(start: Node, target: Node) -> bool:
+    seen = {start}
+    stack = [start]
+    while stack:
+        node = stack.pop()
+        if node is target:
+            return True
+        for _, succ in node.successors():
+            if succ not in seen:
+                seen.add(succ)
+                stack.append(succ)
+    return False
+
+
+def compile_templates(template_registry: dict) -> Dict[str, CompiledGraph]:
+    """
+    Builds every registered template once. Template parameters are passed
+    in as "@param" references, so binding a request just seeds the context.
+    """
+    compiled = {}
+    for name, info in template_registry.items():
+        params = info["params"] or []
+        try:
+            spec = info["builder"](**{p: f"@{p}" for p in params})
+            compiled[name] = compile_graph(spec, params)
+        except Exception as e:
+            logger.error(f"Skipping invalid template '{name}': {e}")
+
+    logger.info(f"Compiled {len(compiled)} task graph templates")
+    return compiled
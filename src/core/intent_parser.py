@@ -1,10 +1,15 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, Tuple
-from pathlib import Path
-import joblib
-import re
+from typing import Any, Dict, List, Tuple
+import asyncio, time
 
+from configs.config import INTENT_SCORER_DIR
 from src.core.logger import logger
+from src.core.scorer import IntentScorer, SklearnScorer
+from src.core.rules import RuleSet, TEMPLATE_RULES, SLIDER_RULES
+from src.core.registry import RegistryIndex
+from src.core.paths import PathResolver
+from src.core import tracing
 
 
 
@@ -17,41 +22,92 @@ class Intent:
     confidence: float = 1.0
 
 
+
+# ---------------- Model Loading ----------------
+
+_model_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+_model_future: Future | None = None
+MODEL_LOAD_STATS: Dict[str, Any] = {}
+
+
+def _load_model():
+    started = time.perf_counter()
+
+    # the NumPy scorer avoids importing sklearn; pickles are the fallback
+    if IntentScorer.exists(INTENT_SCORER_DIR):
+        scorer = IntentScorer.load(INTENT_SCORER_DIR)
+    else:
+        scorer = SklearnScorer.load()
+    loaded = time.perf_counter()
+
+    # pull in mmapped pages and lazy imports before the first real request
+    scorer.predict(["warm up"])
+
+    MODEL_LOAD_STATS.update(
+        scorer=type(scorer).__name__,
+        load_s=round(loaded - started, 4),
+        warmup_s=round(time.perf_counter() - loaded, 4),
+    )
+    logger.info(f"Intent model ready: {MODEL_LOAD_STATS}")
+    return scorer
+
+
+def load_model_async() -> Future:
+    """Starts loading the intent model once; later calls share the same future."""
+    global _model_future
+    if _model_future is None or (_model_future.done() and _model_future.exception()):
+        _model_future = _model_loader.submit(_load_model)
+    return _model_future
+
+
+
 class IntentParser:
     CONF_THRESHOLD = 0.3
-    EXECUTABLE_SUFFIXES = {".exe", ".com", ".bat", ".cmd", ".msi"}
+    # intents resolved through file_registry lookups
+    REGISTRY_ACTIONS = {"open_app", "open_folder", "open_file"}
 
-    def __init__(self, registry: dict):
+    def __init__(self, registry: dict, path_resolver: PathResolver | None = None):
+        self.paths = path_resolver or PathResolver()
         self.modules = registry.get("modules", {})
         self.file_registry = registry.get("file_registry", {})
+        self.registry_index = RegistryIndex(self.file_registry)
 
-        self.intent_model = joblib.load("src/models/intent_predictor_model.pkl")
-        self.vectorizer = joblib.load("src/models/vectorizer.pkl")
-        self.label_encoder = joblib.load("src/models/label_encoder.pkl")
+        # loads in the background; rule-routed intents don't need it
+        self.model_future = load_model_async()
+        self.scorer = None
 
+        self.template_rules = RuleSet(TEMPLATE_RULES)
+        self.slider_rules = RuleSet(SLIDER_RULES)
 
 
-    def temp_parse(self, user_input: str) -> Intent:
-        text = user_input.lower()
+    def update_registry(self, registry: dict, diff: dict):
+        # plain reassignment, so a request holding the old dict is not affected
+        if diff["modules"]:
+            self.modules = registry.get("modules", {})
+        if diff["file_registry"]:
+            self.file_registry = registry.get("file_registry", {})
+            self.registry_index.update(diff)
 
-        if "setup" in text and "project" in text:
-            return Intent(action="start_project")
 
-        if "open" in text and "project" in text:
-            return Intent(action="open_project")
 
-        if "prepare" in text and "work" in text:
-            return Intent(action="prepare_work_environment")
-        
-        if "open copied path" in text:
-            return Intent(action="open_copied_path")
+    def temp_parse(self, user_input: str) -> Intent:
+        match = self.template_rules.match(user_input.lower())
+        if match:
+            rule, params = match
+            return Intent(action=rule.intent, params=params)
 
         return Intent(action="fallback")
 
 
-    def parse(self, user_input: str) -> Intent:
+    async def parse(self, user_input: str, prediction: Tuple[str, float] | None = None) -> Intent:
+        with tracing.span("intent.parse", batched=prediction is not None) as span:
+            intent_obj = await self._parse(user_input, prediction)
+            span.set(intent=intent_obj.action, confidence=float(intent_obj.confidence))
+            return intent_obj
+
+    async def _parse(self, user_input: str, prediction: Tuple[str, float] | None) -> Intent:
         text = user_input.lower()
-        intent, confidence = self.predict_intent(text)
+        intent, confidence = prediction or self.predict_intent(text)
 
         logger.debug(f"Predicted intent={intent}, confidence={confidence}")
 
@@ -59,7 +115,7 @@ class IntentParser:
             return Intent("fallback", confidence=confidence)
 
         if intent == "open":
-            return self._handle_open(text, confidence)
+            return await self._handle_open(text, confidence)
 
         if intent in ("get_time", "get_date", "get_day"):
             return Intent(
@@ -81,24 +137,24 @@ class IntentParser:
 
     # ---------------- Intent Handlers ----------------
 
-    def _handle_open(self, text: str, confidence: float) -> Intent:
-        file_key = self._match_registry_key(text)
+    async def _handle_open(self, text: str, confidence: float) -> Intent:
+        # read once, the registry may be swapped by a background refresh
+        file_registry = self.file_registry
+
+        file_key = self._match_registry_key(text, file_registry)
         if not file_key:
             raise ValueError("No matching file or app found")
 
-        path = self.file_registry[file_key]
+        # classified when the registry loaded; anything else is stat'ed off the loop
+        kind = self.paths.registry_kind(file_key) or await self.paths.classify(file_registry[file_key])
 
-        if path.startswith(("http://", "https://")):
+        if kind in ("url", "executable"):
             return Intent("open_app", {"app_name": file_key}, confidence)
 
-        wsl_path = Path(self._to_wsl_path(path))
-
-        if wsl_path.is_dir():
+        if kind == "dir":
             return Intent("open_folder", {"folder_name": file_key}, confidence)
 
-        if wsl_path.is_file():
-            if wsl_path.suffix.lower() in self.EXECUTABLE_SUFFIXES:
-                return Intent("open_app", {"app_name": file_key}, confidence)
+        if kind == "file":
             return Intent("open_file", {"file_name": file_key}, confidence)
 
         raise ValueError("Unrecognized path type")
@@ -107,60 +163,48 @@ class IntentParser:
     # ---------------- Param Extraction ----------------
 
     def _extract_slider_params(self, text: str) -> Tuple[int | None, str | None]:
-        value = self._extract_number(text)
-
-        if any(k in text for k in ("mute", "silent")):
-            return 0, "set"
-
-        if any(k in text for k in ("max", "full")):
-            return 100, "set"
-
-        if any(k in text for k in ("half", "medium")):
-            return 50, "set"
-
-        if any(k in text for k in ("decrease", "lower", "down")):
-            return value, "dec"
-
-        if any(k in text for k in ("increase", "raise", "up")):
-            return value, "inc"
-
-        if any(k in text for k in ("set", "change")):
-            return value, "set"
+        match = self.slider_rules.match(text)
+        if not match:
+            return None, None
 
-        return None, None
+        _, params = match
+        return params.get("value"), params.get("mode")
 
     
     # ---------------- Helpers ----------------
 
-    def _match_registry_key(self, text: str) -> str | None:
-        for key in self.file_registry:
-            if key in text:
+    def _match_registry_key(self, text: str, file_registry: dict) -> str | None:
+        # longest match wins; skip keys from a registry swap still in progress
+        for key in self.registry_index.matches(text):
+            if key in file_registry:
                 return key
         return None
     
 
-    def _extract_number(self, text: str) -> int | None:
-        match = re.search(r"\b(?:by|to)\s+(\d+)\b", text)
-        return int(match.group(1)) if match else None
-
-
-    def _to_wsl_path(self, windows_path: str) -> str:
-        drive = windows_path[0].lower()
-        tail = windows_path[2:].replace("\\", "/")
-        return f"/mnt/{drive}/{tail}"
-
    
     # ---------------- ML Model ----------------
 
     def predict_intent(self, text: str) -> Tuple[str, float]:
-        vect = self.vectorizer.transform([text])
-        pred = self.intent_model.decision_function(vect)
-        idx = pred.argmax()
+        return self.predict_intents([text])[0]
+
+
+    def predict_intents(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Scores a batch of utterances with one sparse matrix operation."""
+        if not texts:
+            return []
+
+        # read once, retraining may swap the scorer
+        scorer = self.scorer
+        if scorer is None:
+            # only blocks when called before the model finished loading
+            scorer = self.scorer = self.model_future.result()
+
+        return scorer.predict(texts)
 
-        intent = self.label_encoder.inverse_transform([idx])[0]
-        confidence = float(abs(pred[0][idx]))
 
-        return intent, confidence
+    async def wait_for_model(self):
+        if self.scorer is None:
+            self.scorer = await asyncio.wrap_future(self.model_future)
 
 
 
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+import asyncio
+
+from configs.config import PATH_CACHE_SIZE, PATH_CACHE_TTL, PATH_WORKERS
+from src.core.cache import TTLCache
+from src.core.logger import logger
+
+
+
+EXECUTABLE_SUFFIXES = {".exe", ".com", ".bat", ".cmd", ".msi"}
+
+
+def to_wsl_path(windows_path: str) -> str:
+    """C:\\Users\\me -> /mnt/c/Users/me"""
+    drive = windows_path[0].lower()
+    tail = windows_path[2:].replace("\\", "/").lstrip("/")
+    return f"/mnt/{drive}/{tail}"
+
+
+def is_windows_path(path: str) -> bool:
+    return len(path) >= 2 and path[1] == ":" and path[0].isalpha()
+
+
+class PathResolver:
+    """
+    Classifies paths as "url", "dir", "executable", "file" or "missing".
+
+    Stats over the WSL drvfs bridge are slow, so every file_registry entry
+    is classified up front (in a thread pool) when the registry loads, and
+    other paths are cached for PATH_CACHE_TTL seconds. Registry entries
+    found "missing" are only kept in that cache, so they get re-checked
+    once it expires.
+    """
+
+    def __init__(self, max_workers=PATH_WORKERS):
+        self.registry_kinds: Dict[str, str] = {}
+        self.cache = TTLCache(PATH_CACHE_SIZE, PATH_CACHE_TTL)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="paths")
+
+
+    # ---------------- Registry ----------------
+
+    async def load_registry(self, file_registry: dict):
+        self.registry_kinds = self._found(await self._classify_many(file_registry))
+        logger.info(f"Classified {len(self.registry_kinds)} registry paths")
+
+    async def update_registry(self, registry: dict, diff: dict):
+        if not diff["file_registry"]:
+            return
+
+        file_registry = registry.get("file_registry", {})
+        fresh = await self._classify_many(
+            {key: file_registry[key] for key in diff["added"] | diff["changed"]}
+        )
+
+        stale = diff["removed"] | diff["changed"]
+        kinds = {k: v for k, v in self.registry_kinds.items() if k not in stale}
+        kinds.update(self._found(fresh))
+        self.registry_kinds = kinds
+
+    def registry_kind(self, key: str) -> str | None:
+        return self.registry_kinds.get(key)
+
+    async def _classify_many(self, paths: dict) -> Dict[str, str]:
+        kinds = await asyncio.gather(*(self.classify(path) for path in paths.values()))
+        return dict(zip(paths.keys(), kinds))
+
+    @staticmethod
+    def _found(kinds: Dict[str, str]) -> Dict[str, str]:
+        return {key: kind for key, kind in kinds.items() if kind != "missing"}
+
+
+    # ---------------- Classification ----------------
+
+    async def classify(self, path: str) -> str:
+        kind = self.cache.get(path)
+        if kind is None:
+            loop = asyncio.get_running_loop()
+            kind = await loop.run_in_executor(self.pool, self._stat_kind, path)
+            self.cache.set(path, kind)
+        return kind
+
+    def classify_sync(self, path: str) -> str:
+        """For callers already off the event loop (or without one)."""
+        kind = self.cache.get(path)
+        if kind is None:
+            kind = self._stat_kind(path)
+            self.cache.set(path, kind)
+        return kind
+
+    def exists(self, path: str) -> bool:
+        return self.classify_sync(path) != "missing"
+
+    def _stat_kind(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return "url"
+
+        local = Path(to_wsl_path(path) if is_windows_path(path) else path)
+        try:
+            if local.is_dir():
+                return "dir"
+            if local.is_file():
+                return "executable" if local.suffix.lower() in EXECUTABLE_SUFFIXES else "file"
+        except OSError as e:
+            logger.warning(f"Cannot stat {local}: {e}")
+        return "missing"
+
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
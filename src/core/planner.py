@@ -1,10 +1,14 @@
-from src.core.intent_parser import IntentParser
+from src.core.intent_parser import Intent, IntentParser
+from src.core.cache import TTLCache
 from src.core import templates
 from dataclasses import dataclass
 from typing import Dict, Any
 from src.core.logger import logger
 from src.core.templates import TEMPLATE_REGISTRY
-import importlib
+from src.core.graph import compile_graph, compile_templates
+from src.core.template_loader import TemplateLoader, parse_template
+from src.core import tracing
+from configs.config import INTENT_CACHE_SIZE, INTENT_CACHE_TTL, TEMPLATES_PATH
 
 
 
@@ -23,30 +27,135 @@ class PlannerOutput:
 
 
 class Planner:
-    def __init__(self, registry):
-        self.intent_parser = IntentParser(registry)
-
-
-    def plan(self, planner_input):
-        intent_obj = self.intent_parser.temp_parse(planner_input.user_input)
+    def __init__(self, registry, path_resolver=None):
+        self.intent_parser = IntentParser(registry, path_resolver)
+
+        # built and validated once; requests only bind parameters
+        self.builtin_graphs = compile_templates(TEMPLATE_REGISTRY)
+        self.graphs = dict(self.builtin_graphs)
+
+        # configs/templates.json, layered over the Python templates
+        self.template_loader = TemplateLoader(TEMPLATES_PATH)
+        self.reload_templates()
+
+        # normalized utterance -> parsed Intent, skips ML inference on repeats
+        self.intent_cache = TTLCache(INTENT_CACHE_SIZE, INTENT_CACHE_TTL)
+        self._registry_generation = 0
+
+
+    def update_registry(self, registry, diff):
+        self.intent_parser.update_registry(registry, diff)
+
+        if diff["file_registry"]:
+            self._registry_generation += 1
+            dropped = self.intent_cache.invalidate(
+                lambda _, intent: intent.action in IntentParser.REGISTRY_ACTIONS
+            )
+            logger.debug(f"Dropped {dropped} cached intents after registry change")
+
+
+    def reload_templates(self) -> bool:
+        """Recompiles the templates.json entries changed since the last call."""
+        polled = self.template_loader.poll()
+        if polled is None:
+            return False
+
+        changed, removed = polled
+        graphs = dict(self.graphs)
+        available_actions = self.available_actions()
+
+        for name in removed:
+            if name in self.builtin_graphs:
+                graphs[name] = self.builtin_graphs[name]
+            else:
+                graphs.pop(name, None)
+
+        for name, raw in changed.items():
+            try:
+                spec, params = parse_template(name, raw)
+                self.validate_graph(spec, available_actions)
+                graphs[name] = compile_graph(spec, params)
+            except Exception as e:
+                # the previous version (if any) stays live
+                logger.error(f"Skipping invalid template '{name}' from {TEMPLATES_PATH}: {e}")
+
+        # single assignment, in-flight requests keep the graphs they bound
+        self.graphs = graphs
+        logger.info(f"Loaded templates: {len(changed)} changed, {len(removed)} removed")
+        return True
+
+    def available_actions(self) -> set:
+        """Action names exposed by the Windows agent's registry modules."""
+        actions = set()
+        for module_actions in self.intent_parser.modules.values():
+            actions.update(module_actions)
+        return actions
+
+
+    async def plan_async(self, planner_input, batcher=None):
+        """
+        Cached intent, template graph or parsed intent for one utterance.
+        Waits for the intent model without blocking the loop, and ML
+        classification goes through the micro-batcher when one is given.
+        """
+        with tracing.span("planner.plan") as span:
+            cached = self._cached_intent(planner_input.user_input)
+            if cached:
+                span.set(outcome="cached", intent=cached.action)
+                return cached
+
+            intent_obj = self.intent_parser.temp_parse(planner_input.user_input)
+
+            prediction = None
+            if intent_obj.action == "fallback":
+                with tracing.span("intent.wait_model"):
+                    await self.intent_parser.wait_for_model()
+                if batcher is not None:
+                    with tracing.span("intent.classify", batched=True):
+                        prediction = await batcher.predict(planner_input.user_input.lower())
+
+            return await self._plan_intent(planner_input, intent_obj, prediction)
+
+
+    async def _plan_intent(self, planner_input, intent_obj, prediction=None):
         intent = intent_obj.action
         logger.info(f"intent: {intent_obj}")
+        tracing.annotate(intent=intent)
 
         # handle templates
-        func_info = TEMPLATE_REGISTRY.get(intent) if intent in TEMPLATE_REGISTRY else None
-        if func_info:
-            module = importlib.import_module(func_info["module"])
-            graph = getattr(module, func_info["function"])()
-            return graph
+        graph = self.graphs.get(intent)
+        if graph:
+            return graph.bind(intent_obj.params)
 
         if intent == "fallback":
-            intent_obj = self.intent_parser.parse(planner_input.user_input)
+            generation = self._registry_generation
+            intent_obj = await self.intent_parser.parse(planner_input.user_input, prediction)
+
+            # a registry swap during parsing may have made this result stale
+            if generation == self._registry_generation:
+                self.intent_cache.set(self._cache_key(planner_input.user_input), self._copy(intent_obj))
         
         return intent_obj
 
 
+    def _cached_intent(self, user_input):
+        intent_obj = self.intent_cache.get(self._cache_key(user_input))
+        if intent_obj is None:
+            return None
+
+        logger.info(f"intent (cached): {intent_obj}")
+        return self._copy(intent_obj)
+
+    def _cache_key(self, user_input):
+        return " ".join(user_input.lower().split())
+
+    def _copy(self, intent_obj):
+        return Intent(intent_obj.action, dict(intent_obj.params), intent_obj.confidence)
 
 
+
+
+    @staticmethod
     def validate_graph(graph: dict, available_actions: set):
         tg = graph["task_graph"]
         nodes = tg["nodes"]
@@ -54,12 +163,13 @@ class Planner:
         if tg["entry"] not in nodes:
             raise ValueError("Invalid entry node")
 
-        
+        # no registry yet (agent offline, no snapshot): nothing to check against
+        if not available_actions:
+            return
+
         for node_id, node in nodes.items():
 
             # check the action node with the avialable actions
             if node["type"] == "action":
                 if node["controller"] not in available_actions:
                     raise ValueError(f"Unknown controller: {node['controller']}")
-
-
@@ -0,0 +1,141 @@
+import asyncio, hashlib, json, os, threading, time
+from typing import Iterable, List
+import httpx
+
+from configs.config import REGISTRY_SNAPSHOT_PATH, REGISTRY_RETRY_INTERVAL
+from src.core.logger import logger
+from src.core.rules import KeywordAutomaton
+
+
+
+def registry_version(registry: dict) -> str:
+    """Content hash, used when the agent doesn't send an ETag."""
+    raw = json.dumps(registry, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def diff_registry(old: dict | None, new: dict) -> dict:
+    """What changed between two registries, so only affected indexes get rebuilt."""
+    old = old or {}
+    old_files = old.get("file_registry", {})
+    new_files = new.get("file_registry", {})
+
+    diff = {
+        "modules": old.get("modules") != new.get("modules"),
+        "added": {k for k in new_files if k not in old_files},
+        "removed": {k for k in old_files if k not in new_files},
+        "changed": {k for k in new_files if k in old_files and old_files[k] != new_files[k]},
+    }
+    diff["file_registry"] = bool(diff["added"] or diff["removed"] or diff["changed"])
+    return diff
+
+
+class RegistryIndex:
+    """
+    Finds file_registry keys mentioned in an utterance in time proportional
+    to the utterance length, ranked longest first ("visual studio code"
+    beats "code"), earlier position breaking ties.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.automaton = KeywordAutomaton(keys)
+        # updates come from the registry watcher, lookups from request handlers
+        self._lock = threading.Lock()
+
+    def update(self, diff: dict):
+        with self._lock:
+            for key in diff["removed"]:
+                self.automaton.remove(key)
+            for key in diff["added"]:
+                self.automaton.add(key)
+
+    def matches(self, text: str) -> List[str]:
+        with self._lock:
+            found = {}
+            for start, key in self.automaton.iter_matches(text):
+                found.setdefault(key, start)
+
+        return sorted(found, key=lambda k: (-len(k), found[k]))
+
+
+class RegistryCache:
+    """
+    Local snapshot of the Windows action registry (modules + file_registry).
+
+    Startup serves the snapshot right away and revalidates it against the
+    agent in the background with a conditional request.
+    """
+
+    def __init__(self, path=REGISTRY_SNAPSHOT_PATH):
+        self.path = path
+        self.registry = None
+        self.version = None
+        self.etag = None
+
+
+    def load_snapshot(self) -> dict | None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable registry snapshot {self.path}: {e}")
+            return None
+
+        self.registry = snapshot["registry"]
+        self.version = snapshot["version"]
+        self.etag = snapshot.get("etag")
+        logger.info(f"Loaded registry snapshot {self.version[:8]} from {self.path}")
+        return self.registry
+
+
+    def save_snapshot(self):
+        snapshot = {
+            "version": self.version,
+            "etag": self.etag,
+            "saved_at": time.time(),
+            "registry": self.registry,
+        }
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+    async def revalidate(self, client, timeout=5) -> bool | None:
+        """
+        Check the agent for a newer registry.
+        Returns True if it changed, False if unchanged, None if the agent
+        could not be reached.
+        """
+        try:
+            registry, etag = await client.fetch_registry(etag=self.etag, timeout=timeout)
+        except httpx.HTTPError as e:
+            logger.warning(f"Registry revalidation failed: {e}")
+            return None
+
+        if registry is None:
+            logger.debug("Registry not modified")
+            return False
+
+        version = registry_version(registry)
+        self.etag = etag
+        if version == self.version:
+            return False
+
+        logger.info(f"Registry changed: {(self.version or 'none')[:8]} -> {version[:8]}")
+        self.registry, self.version = registry, version
+        self.save_snapshot()
+        return True
+
+
+    async def refresh_until_available(self, client, interval=REGISTRY_RETRY_INTERVAL) -> bool:
+        """Keep revalidating until the agent answers; returns whether it changed."""
+        while True:
+            changed = await self.revalidate(client)
+            if changed is not None:
+                return changed
+            await asyncio.sleep(interval)
@@ -0,0 +1,191 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+import re
+
+
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton: finds every occurrence of every pattern in one
+    pass over the text, independent of how many patterns there are.
+    Matching is plain substring matching, same as `pattern in text`.
+
+    Patterns can be added/removed later; the trie is updated in place and
+    only the failure links are recomputed, lazily on the next scan.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._own: List[str | None] = [None]
+        self._out: List[Tuple[str, ...]] = [()]
+        self._dirty = False
+
+        for pattern in set(patterns):
+            self.add(pattern)
+        self._link()
+
+    def __len__(self):
+        return sum(own is not None for own in self._own)
+
+    def add(self, pattern: str):
+        if not pattern:
+            return
+
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(None)
+                self._out.append(())
+            state = nxt
+
+        self._own[state] = pattern
+        self._dirty = True
+
+    def remove(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            state = self._goto[state].get(ch)
+            if state is None:
+                return
+
+        # the trie path stays, it just stops being a match
+        if self._own[state] is not None:
+            self._own[state] = None
+            self._dirty = True
+
+    def _link(self):
+        self._out[0] = ()
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+            self._out[state] = (self._own[state],) if self._own[state] is not None else ()
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+
+                own = (self._own[nxt],) if self._own[nxt] is not None else ()
+                self._out[nxt] = own + self._out[self._fail[nxt]]
+
+        self._dirty = False
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yields (start, pattern) for every occurrence."""
+        if self._dirty:
+            self._link()
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            for pattern in out[state]:
+                yield i - len(pattern) + 1, pattern
+
+    def find_all(self, text: str) -> set:
+        return {pattern for _, pattern in self.iter_matches(text)}
+
+
+
+# ---------------- Slot Extractors ----------------
+
+_NUMBER_RE = re.compile(r"\b(?:by|to)\s+(\d+)\b")
+
+def extract_number(text: str) -> int | None:
+    match = _NUMBER_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+SLOT_EXTRACTORS: Dict[str, Callable[[str], Any]] = {
+    "value": extract_number,
+}
+
+
+
+# ---------------- Rules ----------------
+
+@dataclass(frozen=True)
+class Rule:
+    intent: str
+    requires: Tuple[str, ...] = ()      # every keyword must occur
+    any_of: Tuple[str, ...] = ()        # at least one keyword must occur
+    slots: Dict[str, Any] = field(default_factory=dict)
+    extract: Tuple[str, ...] = ()       # slots filled by SLOT_EXTRACTORS
+
+
+class RuleSet:
+    """
+    Ordered rule table compiled into one keyword automaton.
+    The first rule (in table order) whose keywords are satisfied wins.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = list(rules)
+        self._by_keyword: Dict[str, List[int]] = {}
+
+        for idx, rule in enumerate(self.rules):
+            for keyword in set(rule.requires) | set(rule.any_of):
+                self._by_keyword.setdefault(keyword, []).append(idx)
+
+        self.automaton = KeywordAutomaton(self._by_keyword)
+
+    def match(self, text: str) -> Tuple[Rule, Dict[str, Any]] | None:
+        """Returns the winning rule and its filled slots."""
+        found = self.automaton.find_all(text)
+
+        # only rules touched by a found keyword are considered
+        hits: Dict[int, set] = {}
+        for keyword in found:
+            for idx in self._by_keyword[keyword]:
+                hits.setdefault(idx, set()).add(keyword)
+
+        for idx in sorted(hits):
+            rule, seen = self.rules[idx], hits[idx]
+            if len(seen.intersection(rule.requires)) != len(rule.requires):
+                continue
+            if rule.any_of and seen.isdisjoint(rule.any_of):
+                continue
+
+            params = dict(rule.slots)
+            for slot in rule.extract:
+                params[slot] = SLOT_EXTRACTORS[slot](text)
+            return rule, params
+
+        return None
+
+
+
+# Templated task graphs, matched before the ML classifier
+TEMPLATE_RULES = [
+    Rule("start_project", requires=("setup", "project")),
+    Rule("open_project", requires=("open", "project")),
+    Rule("prepare_work_environment", requires=("prepare", "work")),
+    Rule("open_copied_path", requires=("open copied path",)),
+]
+
+# volume / brightness adjustments
+SLIDER_RULES = [
+    Rule("slider", any_of=("mute", "silent"), slots={"value": 0, "mode": "set"}),
+    Rule("slider", any_of=("max", "full"), slots={"value": 100, "mode": "set"}),
+    Rule("slider", any_of=("half", "medium"), slots={"value": 50, "mode": "set"}),
+    Rule("slider", any_of=("decrease", "lower", "down"), slots={"mode": "dec"}, extract=("value",)),
+    Rule("slider", any_of=("increase", "raise", "up"), slots={"mode": "inc"}, extract=("value",)),
+    Rule("slider", any_of=("set", "change"), slots={"mode": "set"}, extract=("value",)),
+]
@@ -0,0 +1,265 @@
+"""
+Dependency-free intent scorer.
+
+`export_scorer` turns the sklearn TfidfVectorizer + LinearSVC + LabelEncoder
+pickles into plain arrays:
+
+    intent_scorer/
+        meta.json        vocabulary, labels and vectorizer settings
+        coef.npy         (n_features, n_classes) float64, memory-mapped at load
+        intercept.npy    (n_classes,)
+        idf.npy          (n_features,), only when use_idf
+
+`IntentScorer` then reproduces `decision_function` with NumPy only.
+
+    python -m src.core.scorer            # export + verify against data/commands.csv
+"""
+from itertools import chain
+from typing import List, Tuple
+import csv, json, os, re
+import numpy as np
+
+from configs.config import INTENT_SCORER_DIR, INTENT_MODEL_PATHS, COMMANDS_PATH
+
+
+
+def _run_starts(values: np.ndarray) -> np.ndarray:
+    """Positions where a run of equal values starts in a sorted array."""
+    mask = np.empty(values.size, dtype=bool)
+    mask[:1] = True
+    np.not_equal(values[1:], values[:-1], out=mask[1:])
+    return mask.nonzero()[0]
+
+
+
+class IntentScorer:
+    def __init__(self, vocabulary, labels, coef, intercept, idf=None, token_pattern=r"(?u)\b\w\w+\b",
+                 ngram_range=(1, 1), lowercase=True, binary=False, sublinear_tf=False, norm="l2"):
+        self.vocabulary = vocabulary
+        self.labels = labels
+        self.coef = coef
+        self.intercept = intercept
+        self.idf = idf
+
+        self.token_re = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.binary = binary
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+
+
+    @classmethod
+    def load(cls, path=INTENT_SCORER_DIR, mmap=True) -> "IntentScorer":
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        idf_path = os.path.join(path, "idf.npy")
+        return cls(
+            vocabulary=meta["vocabulary"],
+            labels=meta["labels"],
+            coef=np.load(os.path.join(path, "coef.npy"), mmap_mode=mode),
+            intercept=np.load(os.path.join(path, "intercept.npy")),
+            idf=np.load(idf_path, mmap_mode=mode) if os.path.exists(idf_path) else None,
+            **meta["vectorizer"],
+        )
+
+    @staticmethod
+    def exists(path=INTENT_SCORER_DIR) -> bool:
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+
+    # ---------------- Vectorizing ----------------
+
+    def _terms(self, text: str) -> List[str]:
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_re.findall(text)
+
+        low, high = self.ngram_range
+        if high == 1:
+            return tokens
+
+        terms = tokens if low == 1 else []
+        for n in range(max(low, 2), high + 1):
+            terms += [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return terms
+
+    def _matrix(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sparse tf-idf rows of the whole batch as (row, feature index, weight)
+        entries, sorted by row. Only tokenizing runs per text.
+        """
+        vocabulary = self.vocabulary
+        ids = [[vocabulary[t] for t in self._terms(text) if t in vocabulary] for text in texts]
+
+        lengths = np.fromiter(map(len, ids), dtype=np.intp, count=len(ids))
+        cols = np.fromiter(chain.from_iterable(ids), dtype=np.intp, count=int(lengths.sum()))
+        rows = np.repeat(np.arange(len(texts), dtype=np.intp), lengths)
+
+        # repeated (row, feature) pairs become term counts
+        n_features = self.coef.shape[0]
+        keys = np.sort(rows * n_features + cols)
+        starts = _run_starts(keys)
+        tf = np.empty(starts.size)
+        tf[:-1] = starts[1:] - starts[:-1]
+        tf[-1:] = keys.size - starts[-1:]
+        rows, cols = np.divmod(keys[starts], n_features)
+
+        if self.binary:
+            tf[:] = 1.0
+        elif self.sublinear_tf:
+            tf = np.log(tf) + 1.0
+
+        if self.idf is not None:
+            tf *= self.idf[cols]
+
+        if self.norm == "l2":
+            tf /= np.sqrt(np.bincount(rows, tf * tf, minlength=len(texts)))[rows]
+        elif self.norm == "l1":
+            tf /= np.bincount(rows, np.abs(tf), minlength=len(texts))[rows]
+
+        return rows, cols, tf
+
+
+    # ---------------- Scoring ----------------
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        scores = np.empty((len(texts), self.intercept.size))
+        scores[:] = self.intercept
+
+        rows, cols, weights = self._matrix(texts)
+        if rows.size:
+            # one gather-multiply for the batch, summed per row
+            contributions = self.coef[cols] * weights[:, None]
+            starts = _run_starts(rows)
+            scores[rows[starts]] += np.add.reduceat(contributions, starts, axis=0)
+
+        return scores
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Same (intent, confidence) pairs as IntentParser.predict_intents."""
+        if not texts:
+            return []
+
+        scores = self.decision_function(texts)
+        idx = scores.argmax(axis=1)
+        confidences = np.abs(scores[np.arange(len(texts)), idx])
+
+        return [(self.labels[i], float(conf)) for i, conf in zip(idx, confidences)]
+
+
+
+class SklearnScorer:
+    """Same interface as IntentScorer, backed by the original joblib pickles."""
+
+    def __init__(self, model, vectorizer, label_encoder):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.label_encoder = label_encoder
+
+    @classmethod
+    def load(cls, paths=INTENT_MODEL_PATHS) -> "SklearnScorer":
+        import joblib
+
+        return cls(
+            joblib.load(paths["model"]),
+            joblib.load(paths["vectorizer"]),
+            joblib.load(paths["label_encoder"]),
+        )
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        if not texts:
+            return []
+
+        vect = self.vectorizer.transform(texts)
+        pred = self.model.decision_function(vect)
+        idx = pred.argmax(axis=1)
+
+        intents = self.label_encoder.inverse_transform(idx)
+        confidences = np.abs(pred[np.arange(len(texts)), idx])
+
+        return [(intent, float(conf)) for intent, conf in zip(intents, confidences)]
+
+
+
+# ---------------- Export ----------------
+
+def export_scorer(model, vectorizer, label_encoder, path=INTENT_SCORER_DIR):
+    params = vectorizer.get_params()
+    unsupported = {
+        "analyzer": "word", "preprocessor": None, "tokenizer": None,
+        "stop_words": None, "strip_accents": None,
+    }
+    for name, expected in unsupported.items():
+        if params.get(name) != expected:
+            raise ValueError(f"Cannot export vectorizer with {name}={params.get(name)!r}")
+
+    os.makedirs(path, exist_ok=True)
+
+    meta = {
+        "vocabulary": {term: int(i) for term, i in vectorizer.vocabulary_.items()},
+        # coef rows follow model.classes_, which may be a subset of the encoder's
+        "labels": [str(label) for label in label_encoder.inverse_transform(model.classes_)],
+        "vectorizer": {
+            "token_pattern": params["token_pattern"],
+            "ngram_range": list(params["ngram_range"]),
+            "lowercase": params["lowercase"],
+            "binary": params["binary"],
+            "sublinear_tf": params["sublinear_tf"],
+            "norm": params["norm"],
+        },
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, separators=(",", ":"))
+
+    coef = np.atleast_2d(model.coef_)
+    intercept = np.atleast_1d(model.intercept_)
+    if coef.shape[0] == 1:
+        # binary models score the positive class only
+        coef = np.vstack([-coef, coef])
+        intercept = np.concatenate([-intercept, intercept])
+
+    np.save(os.path.join(path, "coef.npy"), np.ascontiguousarray(coef.T, dtype=np.float64))
+    np.save(os.path.join(path, "intercept.npy"), intercept.astype(np.float64))
+
+    idf_path = os.path.join(path, "idf.npy")
+    if params["use_idf"]:
+        np.save(idf_path, vectorizer.idf_.astype(np.float64))
+    elif os.path.exists(idf_path):
+        os.remove(idf_path)
+
+
+def verify_scorer(scorer, model, vectorizer, label_encoder, texts, atol=1e-9) -> int:
+    """Checks the scorer against sklearn on `texts`; returns the number of mismatches."""
+    expected = model.decision_function(vectorizer.transform(texts))
+    if expected.ndim == 1:
+        expected = np.column_stack([-expected, expected])
+    actual = scorer.decision_function(texts)
+
+    mismatches = 0
+    for text, exp, act in zip(texts, expected, actual):
+        same_label = label_encoder.inverse_transform(model.classes_)[exp.argmax()] == scorer.labels[act.argmax()]
+        if not same_label or not np.allclose(exp, act, atol=atol):
+            mismatches += 1
+            print(f"mismatch: {text!r}")
+    return mismatches
+
+
+def load_commands(path=COMMANDS_PATH) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [row["command"] for row in csv.DictReader(f)]
+
+
+
+if __name__ == "__main__":
+    sklearn_scorer = SklearnScorer.load()
+    model, vectorizer, label_encoder = sklearn_scorer.model, sklearn_scorer.vectorizer, sklearn_scorer.label_encoder
+
+    export_scorer(model, vectorizer, label_encoder)
+    texts = load_commands()
+    mismatches = verify_scorer(IntentScorer.load(), model, vectorizer, label_encoder, texts)
+
+    print(f"Exported scorer to {INTENT_SCORER_DIR}: {len(texts) - mismatches}/{len(texts)} commands match")
+    raise SystemExit(1 if mismatches else 0)
@@ -1,16 +1,216 @@
+"""
+Conditions for decision nodes.
+
+Each condition registers an async evaluator with @condition, plus a cache
+TTL and the Windows agent push events that update it:
+
+    {"event": "process_started", "name": "vlc.exe"}
+    {"event": "process_stopped", "name": "vlc.exe"}
+    {"event": "clipboard_changed", "text": "C:\\Users\\me\\notes.txt"}
+    {"event": "state", "condition": "workspace_ready", "value": true}
+
+An event handler returns the condition's new value, STALE when the event
+only makes the cached value outdated, or None when it does not concern the
+condition. Pushed values are kept for STATE_PUSH_TTL, so decision nodes
+resolve from memory instead of probing.
+Conditions must not depend on the graph context, since results are cached
+by name.
+"""
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping
+import asyncio, csv, posixpath
+
+from configs.config import STATE_PUSH_TTL, STATE_PROBE_TIMEOUT, WORKSPACE_PATH
+from src.core.cache import TTLCache
+from src.core.logger import logger
+from src.core.paths import is_windows_path
+
+
+
+STALE = object()
+
+
+@dataclass(frozen=True)
+class Condition:
+    name: str
+    evaluate: Callable[["StateProvider", dict], Awaitable[bool]]
+    ttl: float = 0
+    events: Mapping[str, Callable[[dict], object]] = field(default_factory=dict)
+
+
+CONDITIONS: Dict[str, Condition] = {}
+
+def condition(name=None, ttl=0, events=None):
+    def wrapper(func):
+        CONDITIONS[name or func.__name__] = Condition(name or func.__name__, func, ttl, events or {})
+        return func
+    return wrapper
+
+
+def process_events(image: str):
+    """Push handlers that track whether `image` (e.g. "vlc.exe") is running."""
+    image = image.lower()
+    return {
+        "process_started": lambda msg: True if msg.get("name", "").lower() == image else None,
+        "process_stopped": lambda msg: False if msg.get("name", "").lower() == image else None,
+    }
+
+
+
+# ---------------- Probes ----------------
+
+async def run_windows_command(*args, timeout=STATE_PROBE_TIMEOUT) -> str | None:
+    """Runs a Windows executable through WSL interop; None if unavailable or failing."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        logger.warning(f"Timed out after {timeout}s: {args[0]}")
+        return None
+    return stdout.decode(errors="ignore") if proc.returncode == 0 else None
+
+
+async def is_process_running(image: str) -> bool:
+    output = await run_windows_command("tasklist.exe", "/FI", f"IMAGENAME eq {image}", "/NH")
+    return bool(output) and image.lower() in output.lower()
+
+
+async def window_titles(image: str) -> List[str]:
+    """Main window titles of the running `image` processes."""
+    output = await run_windows_command("tasklist.exe", "/V", "/FO", "CSV", "/NH", "/FI", f"IMAGENAME eq {image}")
+    titles = []
+    for row in csv.reader((output or "").splitlines()):
+        # image name first, window title last; "INFO: No tasks ..." has one field
+        if len(row) > 1 and row[0].lower() == image.lower() and row[-1] != "N/A":
+            titles.append(row[-1])
+    return titles
+
+
+def is_path_text(text: str | None) -> bool:
+    text = (text or "").strip().strip('"')
+    return "\n" not in text and is_windows_path(text)
+
+
+
+# ---------------- Conditions ----------------
+
+@condition("player_ready", ttl=5, events=process_events("vlc.exe"))
+async def player_ready(state, context) -> bool:
+    return await is_process_running("vlc.exe")
+
+
+WORKSPACE_NAME = posixpath.basename(WORKSPACE_PATH.rstrip("/")).lower()
+
+
+@condition("workspace_ready", ttl=5, events={
+    # another VS Code window says nothing about this workspace; the agent
+    # can push {"event": "state", "condition": "workspace_ready"} instead
+    "process_started": lambda msg: STALE if msg.get("name", "").lower() == "code.exe" else None,
+    "process_stopped": lambda msg: STALE if msg.get("name", "").lower() == "code.exe" else None,
+})
+async def workspace_ready(state, context) -> bool:
+    # VS Code titles its windows "<file> - <folder> - Visual Studio Code"
+    titles = await window_titles("Code.exe")
+    return any(
+        WORKSPACE_NAME in (part.strip().lower() for part in title.split(" - "))
+        for title in titles
+    )
+
+
+@condition("clipboard_has_path", ttl=2, events={
+    "clipboard_changed": lambda msg: is_path_text(msg.get("text")),
+})
+async def clipboard_has_path(state, context) -> bool:
+    text = await run_windows_command("powershell.exe", "-NoProfile", "-Command", "Get-Clipboard")
+    return is_path_text(text)
+
+
+
 class StateProvider:
-    def evaluate(self, condition: str) -> bool:
-        if condition == "player_ready":
-            return self._is_vlc_running()
+    _MISSING = object()
+
+    def __init__(self, conditions: Mapping[str, Condition] = CONDITIONS):
+        self.conditions = conditions
+        self.cache = TTLCache(max_size=len(conditions) or 1)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def attach(self, client):
+        """Listen for state pushed by the Windows agent over the WebSocket channel."""
+        client.on_push(self.handle_push)
+
+
+    # ---------------- Evaluation ----------------
+
+    async def evaluate(self, condition: str, context=None) -> bool:
+        if condition not in self.conditions:
+            raise ValueError(f"Unknown condition: {condition}")
+
+        value = self.cache.get(condition, self._MISSING)
+        if value is not self._MISSING:
+            return value
+        return await asyncio.shield(self._start(condition, context))
+
+    async def evaluate_many(self, conditions: Iterable[str], context=None) -> Dict[str, bool]:
+        """Evaluates independent conditions concurrently."""
+        conditions = list(dict.fromkeys(conditions))
+        values = await asyncio.gather(*(self.evaluate(c, context) for c in conditions))
+        return dict(zip(conditions, values))
+
+    def prefetch(self, conditions: Iterable[str], context=None):
+        """Starts probes for a graph's conditions so its decision nodes find them ready."""
+        for name in conditions:
+            if name in self.conditions and self.cache.get(name, self._MISSING) is self._MISSING:
+                self._start(name, context)
+
+    def _start(self, condition: str, context) -> asyncio.Task:
+        # concurrent decisions on the same condition share one probe
+        task = self._inflight.get(condition)
+        if task is None:
+            task = asyncio.create_task(self._probe(self.conditions[condition], context or {}))
+            self._inflight[condition] = task
+            task.add_done_callback(lambda t: self._probe_done(condition, t))
+        return task
+
+    def _probe_done(self, condition: str, task: asyncio.Task):
+        self._inflight.pop(condition, None)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Condition '{condition}' failed: {task.exception()}")
+
+    async def _probe(self, cond: Condition, context) -> bool:
+        value = bool(await cond.evaluate(self, context))
+        if cond.ttl:
+            self.cache.set(cond.name, value, cond.ttl)
+        return value
+
+
+    # ---------------- Push updates ----------------
 
-        if condition == "clipboard_has_path":
-            return self._clipboard_has_valid_path()
+    def handle_push(self, message: dict):
+        event = message.get("event")
 
-        raise ValueError(f"Unknown condition: {condition}")
+        if event == "state":
+            name = message.get("condition")
+            if name in self.conditions:
+                self.set(name, bool(message.get("value")))
+            return
 
-    def _is_vlc_running(self) -> bool:
-        # os / psutil check
-        return False
+        for cond in self.conditions.values():
+            handler = cond.events.get(event)
+            if handler is None:
+                continue
+            value = handler(message)
+            if value is STALE:
+                self.cache.pop(cond.name)
+            elif value is not None:
+                self.set(cond.name, bool(value))
 
-    def _clipboard_has_valid_path(self) -> bool:
-        return True
\ No newline at end of file
+    def set(self, condition: str, value: bool):
+        self.cache.set(condition, value, STATE_PUSH_TTL)
+        logger.debug(f"State pushed: {condition}={value}")
@@ -0,0 +1,166 @@
+"""
+Declarative task graph templates (configs/templates.json).
+
+Each entry is either a full graph ({"version", "task_graph": {...}}), or a
+list of steps that run in order:
+
+    {
+        "action": "list_folder_contents",        controller / Executor function
+        "params": {"folder_name": "projects"},   node args, "@var" references allowed
+        "store_as": "project_folders",           context key for the result
+        "fetch": "folders",                      field of the result data to store
+        "func": true,                            Executor function instead of a Windows action
+        "kind": "cpu",                           function nodes: "cpu" | "io" | "inline"
+        "retries": 1,
+        "timeout": 2, "backoff": 0.2, "jitter": 0.1,   per attempt / first retry delay / +- fraction
+        "success": false,                        failure does not abort, go on to the next step
+        "fallback_action": {...}                 step run when this one fails
+    }
+
+    {"parallel": [step, ...], "mode": "fail_fast"}   steps run concurrently, then join
+
+or {"params": [...], "deadline": 10, "steps": [...]} for templates taking
+parameters or a time budget other than GRAPH_DEADLINE.
+Templates from the file override the Python ones of the same name.
+"""
+from typing import Dict, Tuple
+import json, os
+
+from src.core.logger import logger
+
+
+
+# step key -> node key
+STEP_KEYS = (
+    ("store_as", "output"), ("fetch", "fetch"), ("retries", "retries"),
+    ("timeout", "timeout"), ("backoff", "backoff"), ("jitter", "jitter"),
+    ("kind", "kind"),
+)
+
+
+def steps_to_graph(name: str, steps: list, deadline=None) -> dict:
+    """Expands a step list into the task graph format used by the Python templates."""
+    nodes = {}
+
+    def node_id(step):
+        base = step["action"] if "action" in step else "parallel"
+        return base if base not in nodes else f"{base}_{len(nodes)}"
+
+    def add_node(step, on_success, on_failure):
+        nid = node_id(step)
+        nodes[nid] = {
+            "type": "function" if step.get("func") else "action",
+            "controller": step["action"],
+            "args": step.get("params", {}),
+            "on_success": on_success,
+            "on_failure": on_failure,
+        }
+        for key, target in STEP_KEYS:
+            if key in step:
+                nodes[nid][target] = step[key]
+        return nid
+
+    # reserve the terminal ids first so steps never take them
+    nodes["done"] = {"type": "noop"}
+    nodes["abort"] = {"type": "abort", "reason": f"{name} failed"}
+
+    def add_step(step, next_id):
+        if "parallel" in step:
+            return add_parallel(step, next_id)
+
+        on_failure = next_id if step.get("success") is False else "abort"
+
+        fallback = step.get("fallback_action")
+        if fallback:
+            on_failure = add_node(fallback, next_id, on_failure)
+
+        return add_node(step, next_id, on_failure)
+
+    def add_parallel(step, next_id):
+        join_id = f"join_{len(nodes)}"
+        nodes[join_id] = {"type": "join", "on_success": next_id, "on_failure": "abort"}
+
+        branches = [add_step(branch, join_id) for branch in step["parallel"]]
+        nid = node_id(step)
+        nodes[nid] = {
+            "type": "parallel",
+            "branches": branches,
+            "join": join_id,
+            "mode": step.get("mode", "fail_fast"),
+        }
+        return nid
+
+    # built back to front, every step needs the id of the one after it
+    next_id = "done"
+    for step in reversed(steps):
+        next_id = add_step(step, next_id)
+
+    # every step may fail through: an unused abort node would be unreachable
+    if not any("abort" in (n.get("on_success"), n.get("on_failure")) for n in nodes.values()):
+        del nodes["abort"]
+
+    graph = {
+        "version": 1.0,
+        "task_graph": {
+            "id": name,
+            "entry": next_id,
+            "nodes": nodes,
+        }
+    }
+    if deadline is not None:
+        graph["task_graph"]["deadline"] = deadline
+    return graph
+
+
+def parse_template(name: str, raw) -> Tuple[dict, list]:
+    """Returns (graph spec, params) for one templates.json entry."""
+    if isinstance(raw, list):
+        return steps_to_graph(name, raw), []
+
+    if isinstance(raw, dict) and "task_graph" in raw:
+        return raw, raw.get("params", [])
+
+    if isinstance(raw, dict) and "steps" in raw:
+        return steps_to_graph(name, raw["steps"], raw.get("deadline")), raw.get("params", [])
+
+    raise ValueError(f"Template '{name}' must be a step list or a task graph")
+
+
+
+class TemplateLoader:
+    """
+    Watches the templates file by modification time. `poll` returns only the
+    entries that changed since the last load, so callers recompile just those.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.raw: Dict[str, object] = {}
+
+    def poll(self) -> Tuple[Dict[str, object], set] | None:
+        """(changed or added entries, removed names), or None if the file is unchanged."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime == self.mtime:
+            return None
+
+        if mtime is None:
+            raw = {}
+        else:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+            except (OSError, ValueError) as e:
+                # half-written file; the next poll retries it
+                logger.error(f"Cannot load templates from {self.path}: {e}")
+                return None
+
+        self.mtime = mtime
+        changed = {name: spec for name, spec in raw.items() if self.raw.get(name) != spec}
+        removed = self.raw.keys() - raw.keys()
+        self.raw = raw
+        return changed, removed
@@ -1,4 +1,7 @@
 
+from configs.config import WORKSPACE_PATH
+
+
 TEMPLATE_REGISTRY = {}
 
 def template(name=None, params=None):
@@ -7,6 +10,7 @@ def template(name=None, params=None):
         TEMPLATE_REGISTRY[name or func.__name__] = {
             "module": module,
             "function": func.__name__,
+            "builder": func,
             "params": params or []
         }
         return func
@@ -33,8 +37,10 @@ def prepare_work_environment() -> dict:
                 "open_folder": {
                     "type": "action",
                     "controller": "open_folder",
-                    "args": {"path": "~/projects/jarvis"},
+                    "args": {"path": WORKSPACE_PATH},
                     "retries": 1,
+                    "backoff": 0.5,
+                    "jitter": 0.2,
                     "on_success": "launch_vscode",
                     "on_failure": "abort"
                 },
@@ -76,6 +82,8 @@ def setup_video_player(folder_name: str) -> dict:
                     "controller": "open_vlc",
                     "args": {"folder_name": folder_name},
                     "retries": 1,
+                    "backoff": 0.5,
+                    "jitter": 0.2,
                     "on_success": "done",
                     "on_failure": "abort"
                 },
@@ -88,27 +96,6 @@ def setup_video_player(folder_name: str) -> dict:
         }
     }
 
-@template(name="open_copied_path")
-def open_copied_path() -> dict:
-    return {
-        "version": 1.0,
-        "task_graph": {
-            "id": "open_copied_path",
-            "goal": "Open explorer in the path from clipboard",
-            "description": "Open explorer with path from clipboard",
-            "entry_point": "get_copied_value",
-            "nodes": {
-                "open_path": {
-                    "type": "action",
-                    "controller": "open_copied_path",
-                    "on_success": "done",
-                    "on_failure": "abort",
-                }
-            }
-        }
-    }
-
-
 @template(name="open_terminal_here")
 def open_terminal_here() -> dict:
     return {
@@ -207,10 +194,17 @@ def start_project() -> dict:
                         "folder": "@project_name"
                     },
                     "output": "project_path",
-                    "on_success": "focus_explorer",
+                    "on_success": "open_workspace",
                     "on_failure": "abort"
                 },
 
+                "open_workspace": {
+                    "type": "parallel",
+                    "branches": ["focus_explorer", "open_vscode"],
+                    "join": "workspace_opened",
+                    "mode": "fail_fast"
+                },
+
                 "focus_explorer": {
                     "type": "action",
                     "controller": "focus_app",
@@ -218,7 +212,7 @@ def start_project() -> dict:
                         "app_name": "explorer",
                         "query": "@project_name"
                     },
-                    "on_success": "open_vscode",
+                    "on_success": "workspace_opened",
                     "on_failure": "open_explorer"
                 },
 
@@ -228,7 +222,7 @@ def start_project() -> dict:
                     "args": {
                         "folder_path": "@project_path"
                     },
-                    "on_success": "open_vscode",
+                    "on_success": "workspace_opened",
                     "on_failure": "abort"
                 },
 
@@ -240,6 +234,12 @@ def start_project() -> dict:
                         "query": "@project_name",
                         "folder_path": "@project_path"
                     },
+                    "on_success": "workspace_opened",
+                    "on_failure": "abort"
+                },
+
+                "workspace_opened": {
+                    "type": "join",
                     "on_success": "done",
                     "on_failure": "abort"
                 },
@@ -254,8 +254,8 @@ def start_project() -> dict:
     }
 
 
-@template(name="organize_folder")
-def organize_folder() -> dict:
+@template(name="organize_folder", params={"target_folder"})
+def organize_folder(target_folder: str) -> dict:
     return {
         "version": 1.0,
         "task_graph": {
@@ -266,7 +266,7 @@ def organize_folder() -> dict:
                 "list_items": {
                     "type": "action",
                     "controller": "list_folder_contents",
-                    "args": {"folder_name": "@target_folder"},
+                    "args": {"folder_name": target_folder},
                     "output": "items",
                     "on_success": "categorize",
                     "on_failure": "abort"
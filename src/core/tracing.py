@@ -0,0 +1,180 @@
+"""
+Per-command tracing.
+
+A trace wraps one command and collects spans from the components it runs
+through: planning, intent parsing, graph nodes and Windows actions. Each
+span records its start (ms since the trace began), duration, attempts and
+outcome. The current trace and span live in context variables, so spans
+opened in parallel branches nest under the node that started them.
+
+    with tracing.span("windows.trigger", action=action) as span:
+        ...
+        span.set(outcome="cached")
+
+With no trace active, span() returns a shared no-op span: one ContextVar
+lookup per call site.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List
+import asyncio, threading, time, uuid
+
+from configs.config import TRACE_BUFFER_SIZE
+
+
+
+class Span:
+    __slots__ = ("trace", "id", "parent", "name", "start", "duration", "attempts", "outcome", "attrs", "_token")
+
+    def __init__(self, trace: "Trace", name: str, attrs: dict):
+        self.trace = trace
+        self.id = len(trace.spans)
+        self.parent = None
+        self.name = name
+        self.start = 0.0
+        self.duration = None
+        self.attempts = None
+        self.outcome = None
+        self.attrs = attrs
+        self._token = None
+
+    def set(self, outcome=None, attempts=None, **attrs):
+        if outcome is not None:
+            self.outcome = outcome
+        if attempts is not None:
+            self.attempts = attempts
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _span.get()
+        self.parent = parent.id if parent is not None and parent.trace is self.trace else None
+        self.start = time.perf_counter() - self.trace.started
+        self.trace.spans.append(self)
+        self._token = _span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.trace.started - self.start
+        _span.reset(self._token)
+
+        if exc_type is not None:
+            if issubclass(exc_type, asyncio.CancelledError):
+                self.outcome = "cancelled"
+            else:
+                self.outcome = "error"
+                self.attrs["error"] = str(exc)
+        elif self.outcome is None:
+            self.outcome = "ok"
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "start_ms": round(self.start * 1000, 3),
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "attempts": self.attempts,
+            "outcome": self.outcome,
+            **self.attrs,
+        }
+
+
+class _NoSpan:
+    """Stands in for a span when nothing is being traced."""
+    __slots__ = ()
+
+    def set(self, outcome=None, attempts=None, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans: List[Span] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class TraceBuffer:
+    """Ring buffer of the most recent finished traces."""
+
+    def __init__(self, max_size: int = TRACE_BUFFER_SIZE):
+        self._traces = deque(maxlen=max_size)
+        # /traces is served from a worker thread
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit: int | None = None) -> List[Trace]:
+        """Newest first."""
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        return traces[:limit] if limit is not None else traces
+
+    def get(self, trace_id: str) -> Trace | None:
+        with self._lock:
+            return next((t for t in self._traces if t.id == trace_id), None)
+
+
+
+_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_span: ContextVar[Span | None] = ContextVar("span", default=None)
+
+TRACES = TraceBuffer()
+
+
+@contextmanager
+def trace(name: str, enabled: bool = True, buffer: TraceBuffer = TRACES):
+    """Traces the enclosed block; yields the Trace, or None when disabled."""
+    if not enabled:
+        yield None
+        return
+
+    current = Trace(name)
+    trace_token, span_token = _trace.set(current), _span.set(None)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.started
+        _span.reset(span_token)
+        _trace.reset(trace_token)
+        buffer.add(current)
+
+
+def span(name: str, **attrs):
+    current = _trace.get()
+    if current is None:
+        return NO_SPAN
+    return Span(current, name, attrs)
+
+
+def annotate(**attrs):
+    """Adds attributes to the innermost open span, if any."""
+    current = _span.get()
+    if current is not None:
+        current.set(**attrs)
@@ -0,0 +1,170 @@
+"""
+Background retraining of the intent model.
+
+Training runs in a separate (spawned) process on data/commands.csv plus the
+corrections collected through /feedback. The pipeline is validated on a
+held-out split against the running model; the candidate, refit on the whole
+dataset and exported as a NumPy scorer, is only then promoted and swapped
+into the live IntentParser.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import asyncio, csv, multiprocessing, os, shutil, time
+
+from configs.config import (
+    COMMANDS_PATH, CORRECTIONS_PATH, INTENT_SCORER_DIR,
+    RETRAIN_HOLDOUT, RETRAIN_MIN_ACCURACY, RETRAIN_TOLERANCE, RETRAIN_EVERY,
+)
+from src.core.logger import logger
+from src.core.scorer import IntentScorer, export_scorer
+
+
+
+def load_dataset(*paths):
+    commands, intents = [], []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                commands.append(row["command"])
+                intents.append(row["intent"])
+    return commands, intents
+
+
+def train_candidate(candidate_dir, current_dir, holdout=RETRAIN_HOLDOUT, seed=22) -> dict:
+    """Runs in the worker process: fit, export and score a candidate model."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.svm import LinearSVC
+
+    commands, intents = load_dataset(COMMANDS_PATH, CORRECTIONS_PATH)
+    train_x, test_x, train_y, test_y = train_test_split(
+        commands, intents, test_size=holdout, random_state=seed
+    )
+
+    label_encoder = LabelEncoder().fit(intents)
+
+    def fit(texts, labels):
+        # same pipeline as src/notebooks/intent_predictor_training.ipynb
+        vectorizer = TfidfVectorizer()
+        model = LinearSVC().fit(vectorizer.fit_transform(texts), label_encoder.transform(labels))
+        return model, vectorizer
+
+    def accuracy(scorer):
+        predicted = [intent for intent, _ in scorer.predict(test_x)]
+        return sum(p == y for p, y in zip(predicted, test_y)) / len(test_y)
+
+    # score the pipeline on the holdout, through the exported scorer
+    shutil.rmtree(candidate_dir, ignore_errors=True)
+    export_scorer(*fit(train_x, train_y), label_encoder, candidate_dir)
+    candidate_accuracy = accuracy(IntentScorer.load(candidate_dir, mmap=False))
+
+    # the promoted model learns from every command and correction, holdout included
+    shutil.rmtree(candidate_dir, ignore_errors=True)
+    export_scorer(*fit(commands, intents), label_encoder, candidate_dir)
+
+    baseline = accuracy(IntentScorer.load(current_dir)) if IntentScorer.exists(current_dir) else None
+    return {
+        "samples": len(commands),
+        "holdout": len(test_x),
+        "accuracy": candidate_accuracy,
+        "baseline_accuracy": baseline,
+    }
+
+
+def promote(candidate_dir, target_dir):
+    """Moves the candidate into place; the previous model is kept as <dir>.prev."""
+    previous = f"{target_dir}.prev"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(target_dir):
+        # a running scorer keeps its memory-mapped files across the rename
+        os.replace(target_dir, previous)
+    os.replace(candidate_dir, target_dir)
+
+
+
+class ModelTrainer:
+    def __init__(self, planner, model_dir=INTENT_SCORER_DIR, retrain_every=RETRAIN_EVERY):
+        self.planner = planner
+        self.model_dir = model_dir
+        self.candidate_dir = f"{model_dir}.candidate"
+        self.retrain_every = retrain_every
+
+        self.pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.task = None
+        self.pending_corrections = 0
+        self.last_run = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+    def record_correction(self, command: str, intent: str):
+        new_file = not os.path.exists(CORRECTIONS_PATH)
+        with open(CORRECTIONS_PATH, "a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            if new_file:
+                writer.writerow(["command", "intent"])
+            writer.writerow([command, intent])
+
+        self.pending_corrections += 1
+        if self.retrain_every and self.pending_corrections >= self.retrain_every:
+            self.start()
+
+
+    def start(self) -> bool:
+        """Kicks off a retrain in the background; False if one is already running."""
+        if self.running:
+            return False
+        self.task = asyncio.create_task(self.retrain())
+        return True
+
+
+    async def retrain(self) -> dict:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.pending_corrections = 0
+
+        try:
+            report = await loop.run_in_executor(
+                self.pool, train_candidate, self.candidate_dir, self.model_dir
+            )
+            report["accepted"] = self._accept(report)
+
+            if report["accepted"]:
+                # load fully off the loop, then swap with a single assignment
+                scorer = await loop.run_in_executor(None, IntentScorer.load, self.candidate_dir, False)
+                promote(self.candidate_dir, self.model_dir)
+                self.planner.intent_parser.scorer = scorer
+                self.planner.intent_cache.clear()
+                logger.info(f"Swapped in retrained intent model: {report}")
+            else:
+                shutil.rmtree(self.candidate_dir, ignore_errors=True)
+                logger.warning(f"Rejected retrained intent model: {report}")
+
+        except Exception as e:
+            logger.exception("Intent model retraining failed")
+            report = {"accepted": False, "error": str(e)}
+
+        report["duration"] = round(time.perf_counter() - started, 3)
+        self.last_run = report
+        return report
+
+    def _accept(self, report) -> bool:
+        if report["accuracy"] < RETRAIN_MIN_ACCURACY:
+            return False
+        baseline = report["baseline_accuracy"]
+        return baseline is None or report["accuracy"] >= baseline - RETRAIN_TOLERANCE
+
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "pending_corrections": self.pending_corrections,
+            "last_run": self.last_run,
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -1,47 +1,119 @@
+import asyncio
+
+from configs.config import REGISTRY_REFRESH_INTERVAL, TEMPLATES_RELOAD_INTERVAL
+
 try:
     from src.core.planner import PlannerInput, Planner
-    from src.core.intent_parser import Intent
+    from src.core.intent_parser import Intent, load_model_async
     from src.core.client import WindowsClient
     from src.core.planner import Planner
     from src.core.executor import Executor, ExecutionResult
     from src.core.client import WindowsClient
     from src.core.state import StateProvider
+    from src.core.registry import RegistryCache, diff_registry
+    from src.core.paths import PathResolver
+    from src.core.graph import BoundGraph
+    from src.core.logger import logger
 except Exception as e:
     print(e)
 
 
+# keeps fire-and-forget tasks referenced until they finish
+_background_tasks = set()
+
+
 
 
 
 async def initialize_components():
+    # load the intent model in parallel with the registry fetch
+    load_model_async()
+
     windows_client = WindowsClient()
-    registry = await windows_client.load_registry()
+    registry_cache = RegistryCache()
+
+    # serve from the snapshot now, revalidate against the agent in the background
+    registry = registry_cache.load_snapshot()
+    if not registry and await registry_cache.revalidate(windows_client):
+        registry = registry_cache.registry
 
     if registry:
-        planner = Planner(registry)
+        # classify every registry path once, off the event loop
+        path_resolver = PathResolver()
+        await path_resolver.load_registry(registry["file_registry"])
+        windows_client.action_cache.update_registry(registry)
+
+        planner = Planner(registry, path_resolver)
         state_provider = StateProvider()
+        state_provider.attach(windows_client)
 
         executor = Executor(
             controller_client=windows_client,
             state_provider=state_provider,
-            file_registry=registry["file_registry"]
+            file_registry=registry["file_registry"],
+            path_resolver=path_resolver
         )
+
+        for watcher in (
+            _watch_registry(registry_cache, windows_client, planner, executor, path_resolver),
+            _watch_templates(planner),
+        ):
+            task = asyncio.create_task(watcher)
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
         return planner, executor
-    
+
+    await windows_client.close()
     return None, None
 
 
+async def _watch_registry(registry_cache, windows_client, planner, executor, path_resolver):
+    """Refresh the registry periodically and swap changes into the live components."""
+    current = registry_cache.registry
+
+    while True:
+        try:
+            await registry_cache.refresh_until_available(windows_client)
+
+            if current is not registry_cache.registry:
+                diff = diff_registry(current, registry_cache.registry)
+                current = registry_cache.registry
 
+                await path_resolver.update_registry(current, diff)
+                planner.update_registry(current, diff)
+                executor.update_registry(current, diff)
+                windows_client.action_cache.update_registry(current)
+                logger.info(
+                    f"Registry swapped in: +{len(diff['added'])} -{len(diff['removed'])} "
+                    f"~{len(diff['changed'])} files, modules changed={diff['modules']}"
+                )
+        except Exception:
+            logger.exception("Registry refresh failed")
 
+        await asyncio.sleep(REGISTRY_REFRESH_INTERVAL)
 
-async def run_pipeline(user_input: str, planner, executor):
+
+async def _watch_templates(planner):
+    """Pick up edits to configs/templates.json without a restart."""
+    while True:
+        await asyncio.sleep(TEMPLATES_RELOAD_INTERVAL)
+        try:
+            planner.reload_templates()
+        except Exception:
+            logger.exception("Template reload failed")
+
+
+
+
+
+async def run_pipeline(user_input: str, planner, executor, batcher=None):
     planner_input = PlannerInput(
         user_input=user_input,
         memory={},
         system_state={}
     )
     
-    plan = planner.plan(planner_input)
+    plan = await planner.plan_async(planner_input, batcher)
     result = await executor.execute(user_input, plan)
 
     return serialize_plan(plan), serialize_result(result)
@@ -58,6 +130,13 @@ def serialize_plan(plan):
                 "confidence": plan.confidence,
             }
 
+        if isinstance(plan, BoundGraph):
+            return {
+                "type": "task_graph",
+                "graph": plan.spec(),
+                "params": plan.params,
+            }
+
         if isinstance(plan, dict):
             return {
                 "type": "task_graph",